@@ -0,0 +1,127 @@
+# aggregation.py
+# Demand predictions rolled up to borough (LAD11NM), MSOA polygon or ACORN group.
+# Every household is mapped once to an integer group code; the code arrays are
+# cached per (level, households), so a roll-up over any number of dates is a
+# single np.bincount. Household predictions can optionally be reconciled top-down
+# so they sum to given group or grand totals.
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+import geo_index
+from feature_store import HOUSEHOLDS_PATH
+from forecast import forecast_dates
+
+LEVELS = ('region', 'msoa', 'acorn')
+UNASSIGNED = 'unassigned'  # group of households without a polygon or ACORN group
+
+_group_indexes = {}
+_households = None
+
+
+def _household_groups(households_path=HOUSEHOLDS_PATH):
+    global _households
+    if _households is None:
+        _households = pd.read_csv(households_path, usecols=['LCLid', 'Acorn_grouped']).set_index('LCLid')
+    return _households
+
+
+# Group label of every household string id at the given level
+def _labels_for(lclid_strings, level):
+    if level == 'acorn':
+        return _household_groups()['Acorn_grouped'].reindex(lclid_strings).to_numpy(dtype=object)
+
+    # Same single polygon per household as the maps (see geo_index.build_household_polygons)
+    pairs = geo_index.household_polygons().set_index('LCLid')['polygon']
+    polygon = pairs.reindex(lclid_strings)
+    names = geo_index.load_polygons()['MSOA11CD' if level == 'msoa' else 'LAD11NM'].to_numpy(dtype=object)
+    known = polygon.notna().to_numpy()
+    labels = np.full(len(polygon), None, dtype=object)
+    labels[known] = names[polygon[known].to_numpy(dtype='int64')]
+    return labels
+
+
+# (codes, labels) for the households: codes[i] indexes labels, one entry per household
+def group_index(lclids, level, categories=None):
+    if level not in LEVELS:
+        raise ValueError(f'Unknown aggregation level {level!r}, expected one of {LEVELS}')
+    lclids = np.asarray(lclids)
+    key = (level, hashlib.sha1(np.ascontiguousarray(lclids).tobytes()).hexdigest(),
+           hash(tuple(categories)) if categories is not None else None)
+    if key not in _group_indexes:
+        if categories is not None and np.issubdtype(lclids.dtype, np.integer):
+            lclid_strings = np.asarray(categories, dtype=object)[lclids]
+        else:
+            lclid_strings = lclids.astype(object)
+        labels = pd.Series(_labels_for(lclid_strings, level)).fillna(UNASSIGNED).astype(str)
+        codes, uniques = pd.factorize(labels, sort=True)
+        codes.flags.writeable = False
+        _group_indexes[key] = (codes, list(uniques))
+    return _group_indexes[key]
+
+
+# Per-group sums of a households x dates array as one bincount -> groups x dates
+def rollup(values, codes, n_groups):
+    values = np.asarray(values, dtype='float64')
+    if values.ndim == 1:
+        return np.bincount(codes, weights=values, minlength=n_groups)
+    n_dates = values.shape[1]
+    flat_codes = (codes[:, None] + n_groups * np.arange(n_dates)[None, :]).ravel(order='F')
+    sums = np.bincount(flat_codes, weights=values.ravel(order='F'), minlength=n_groups * n_dates)
+    return sums.reshape(n_dates, n_groups).T
+
+
+# Scale household values so each group sums to its target. targets is either per group
+# (groups x dates, or (groups,) applied to every date) or a grand total (a scalar, or
+# one per date) shared out in proportion to the current group sums.
+def reconcile_top_down(values, codes, n_groups, targets):
+    values = np.asarray(values, dtype='float64')
+    sums = rollup(values, codes, n_groups)
+    targets = np.asarray(targets, dtype='float64')
+    n_dates = sums.shape[1] if sums.ndim == 2 else None
+
+    if targets.shape == sums.shape:
+        pass
+    elif targets.shape == (n_groups,) and n_dates is not None:
+        if n_dates == n_groups:
+            raise ValueError(f'Targets of shape {targets.shape} could be per group or per date; '
+                             f'pass them as groups x dates, or per-date totals as shape ({n_dates}, 1)')
+        targets = np.broadcast_to(targets[:, None], sums.shape)
+    elif targets.ndim == 0 or targets.shape in ((n_dates,), (n_dates, 1)):
+        grand = sums.sum(axis=0)
+        share = np.divide(sums, grand, out=np.full_like(sums, 1.0 / n_groups), where=grand != 0)
+        targets = share * targets.reshape(-1) if targets.ndim else share * targets
+    else:
+        raise ValueError(f'Targets of shape {targets.shape} match neither the groups ({n_groups}) '
+                         f'nor the dates ({n_dates})')
+    factors = np.divide(targets, sums, out=np.zeros_like(sums), where=sums != 0)
+    return values * factors[codes]
+
+
+# Predicted demand per group and date: a frame of (group, day, predicted_energy, households).
+# Pass totals (per-group targets or a grand total per date) to reconcile top-down first.
+def predict_aggregated(df, dates, model, level='region', totals=None, store=None):
+    tensor, lclids, dates = forecast_dates(df, dates, model, store)
+    codes, labels = group_index(lclids, level, df.attrs.get('LCLid_categories'))
+    if totals is not None:
+        tensor = reconcile_top_down(tensor, codes, len(labels), totals)
+    sums = rollup(tensor, codes, len(labels))
+
+    aggregated_df = pd.DataFrame({
+        level: np.tile(labels, len(dates)),
+        'day': np.repeat(dates.to_numpy(), len(labels)),
+        'predicted_energy': sums.T.reshape(-1),
+        'households': np.tile(np.bincount(codes, minlength=len(labels)), len(dates))
+    })
+    return aggregated_df
+
+
+# Roll up an existing per-household frame (LCLid plus value_column) for a single date
+def aggregate_frame(values_df, level='region', value_column='predicted_energy'):
+    codes, labels = group_index(values_df['LCLid'].to_numpy(), level, values_df.attrs.get('LCLid_categories'))
+    return pd.DataFrame({
+        level: labels,
+        value_column: rollup(values_df[value_column].to_numpy(), codes, len(labels)),
+        'households': np.bincount(codes, minlength=len(labels))
+    })
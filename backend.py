@@ -1,61 +1,75 @@
 # backend.py
-import pandas as pd
-from sklearn.model_selection import train_test_split
-import xgboost as xgb
-from sklearn.metrics import mean_squared_error, r2_score
-import pulp
+# Only NumPy is imported up front: pandas, the model pipeline's dependencies, the
+# climate client and cryptography load on first use, so the renewable estimates
+# start without them (see startup_profile.py).
 import numpy as np
-import geopandas as gpd
-import matplotlib.pyplot as plt
-import requests
-from cryptography.fernet import Fernet
+from pipeline import DATASET_PATH, MODEL_PARAMS, fit_model, get_context, read_dataset_csv
 
-# Encryption for sensitive data
-key = Fernet.generate_key()
-cipher = Fernet(key)
+# Encryption for sensitive data; the key is generated the first time it is needed
+_cipher = None
+
+def get_cipher():
+    global _cipher
+    if _cipher is None:
+        from cryptography.fernet import Fernet
+        _cipher = Fernet(Fernet.generate_key())
+    return _cipher
 
 def encrypt_data(data):
-    return cipher.encrypt(data.encode())
+    return get_cipher().encrypt(data.encode())
 
 def decrypt_data(encrypted_data):
-    return cipher.decrypt(encrypted_data).decode()
-
-# Load dataset
-def load_dataset():
-    df = pd.read_csv('datasets/daily_dataset.csv')
-    df['day'] = pd.to_datetime(df['day'], format='%d-%m-%Y')
-    df['day_of_week'] = df['day'].dt.dayofweek
-    df['month'] = df['day'].dt.month
-    df['day_of_month'] = df['day'].dt.day
-    df['year'] = df['day'].dt.year
-    df['LCLid'] = df['LCLid'].astype('category').cat.codes
-    df.dropna(inplace=True)
-    return df
+    return get_cipher().decrypt(encrypted_data).decode()
+
+# Load dataset (shared with backend_analysis.py through the pipeline context)
+def load_dataset(use_cache=True):
+    if use_cache:
+        return get_context().dataset()
+    return read_dataset_csv(DATASET_PATH)
 
 # Train model
 def train_model(df):
-    X = df[['LCLid', 'day_of_week', 'month', 'day_of_month', 'year']]
-    y = df['energy_median']
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    model = xgb.XGBRegressor(objective='reg:squarederror', n_estimators=150, learning_rate=0.2)
-    model.fit(X_train, y_train)
-    y_pred = model.predict(X_test)
-    print(f'RMSE: {np.sqrt(mean_squared_error(y_test, y_pred))}')
+    model, metrics = fit_model(df)
+    print(f'RMSE: {metrics["rmse"]}')
+    return model
+
+# Load the stored model for this dataset and config, or train and store it
+def load_or_train_model(df, params=MODEL_PARAMS):
+    model, metadata = get_context().model(params, df)
+    print(f'RMSE: {metadata["metrics"]["rmse"]}')
     return model
 
+SOLAR_EFFICIENCY = 0.15
+DEFAULT_SOLAR_IRRADIANCE = 5.5  # Default placeholder
+ORIENTATION_FACTORS = {'south': 1.0, 'east': 0.75, 'west': 0.75, 'north': 0.5, 'flat': 0.8}
+DEFAULT_ORIENTATION_FACTOR = 0.8
+
+AIR_DENSITY = 1.225
+WIND_EFFICIENCY = 0.4
+
+# Orientation codes used by the array functions: index into ORIENTATIONS, -1 for unknown
+ORIENTATIONS = list(ORIENTATION_FACTORS)
+ORIENTATION_FACTOR_TABLE = np.array([ORIENTATION_FACTORS[o] for o in ORIENTATIONS] + [DEFAULT_ORIENTATION_FACTOR])
+
+# The yield formulas are shared by the scalar and array functions. They only use
+# multiplication and division so Python floats and float64 arrays round identically.
+def _solar_yield(rooftop_area, solar_irradiance, factor):
+    return rooftop_area * solar_irradiance * SOLAR_EFFICIENCY * factor
+
+def _wind_yield(wind_speed, rotor_diameter):
+    radius = rotor_diameter / 2
+    rotor_area = np.pi * (radius * radius)
+    return 0.5 * AIR_DENSITY * rotor_area * (wind_speed * wind_speed * wind_speed) * WIND_EFFICIENCY / 1000  # kWh
+
 # Solar energy prediction
 def predict_solar_energy(rooftop_area, orientation, climate_data):
-    solar_irradiance = climate_data.get('solar_irradiance', 5.5)  # Default placeholder
-    efficiency = 0.15
-    factor = {'south': 1.0, 'east': 0.75, 'west': 0.75, 'north': 0.5, 'flat': 0.8}.get(orientation.lower(), 0.8)
-    return rooftop_area * solar_irradiance * efficiency * factor
+    solar_irradiance = climate_data.get('solar_irradiance', DEFAULT_SOLAR_IRRADIANCE)
+    factor = ORIENTATION_FACTORS.get(orientation.lower(), DEFAULT_ORIENTATION_FACTOR)
+    return _solar_yield(rooftop_area, solar_irradiance, factor)
 
 # Wind energy prediction
 def predict_wind_energy(wind_speed, rotor_diameter):
-    rotor_area = np.pi * (rotor_diameter / 2) ** 2
-    air_density = 1.225
-    efficiency = 0.4
-    return 0.5 * air_density * rotor_area * (wind_speed ** 3) * efficiency / 1000  # kWh
+    return _wind_yield(wind_speed, rotor_diameter)
 
 # Recommendation
 def recommend_energy_source(solar_energy, wind_energy):
@@ -65,12 +79,53 @@ def recommend_energy_source(solar_energy, wind_energy):
         return "Wind"
     return "Both are equally viable."
 
-# Get climate data (API Integration)
+# Orientation names (any case) -> orientation codes; unknown names get -1
+def orientation_codes(orientations):
+    lowered = np.char.lower(np.asarray(orientations, dtype=str))
+    codes = np.full(lowered.shape, -1, dtype='int8')
+    for code, name in enumerate(ORIENTATIONS):
+        codes[lowered == name] = code
+    return codes
+
+# Solar yield per site. orientation takes codes from orientation_codes or names.
+def predict_solar_energy_array(rooftop_area, orientation, solar_irradiance=DEFAULT_SOLAR_IRRADIANCE):
+    orientation = np.asarray(orientation)
+    codes = orientation if np.issubdtype(orientation.dtype, np.integer) else orientation_codes(orientation)
+    codes = np.where((codes >= 0) & (codes < len(ORIENTATIONS)), codes, len(ORIENTATIONS))
+    factor = ORIENTATION_FACTOR_TABLE[codes]
+    return _solar_yield(np.asarray(rooftop_area, dtype='float64'), np.asarray(solar_irradiance, dtype='float64'), factor)
+
+# Wind yield per site
+def predict_wind_energy_array(wind_speed, rotor_diameter):
+    return _wind_yield(np.asarray(wind_speed, dtype='float64'), np.asarray(rotor_diameter, dtype='float64'))
+
+# Recommendation per site, same strings as recommend_energy_source
+def recommend_energy_source_array(solar_energy, wind_energy):
+    solar_energy = np.asarray(solar_energy)
+    wind_energy = np.asarray(wind_energy)
+    return np.where(solar_energy > wind_energy, "Solar",
+                    np.where(wind_energy > solar_energy, "Wind", "Both are equally viable.")).astype(object)
+
+# Screen a fleet of sites given as a DataFrame with rooftop_area, orientation, wind_speed,
+# rotor_diameter and optionally solar_irradiance columns
+def predict_fleet(sites):
+    import pandas as pd
+
+    solar_irradiance = sites['solar_irradiance'] if 'solar_irradiance' in sites else DEFAULT_SOLAR_IRRADIANCE
+    solar_energy = predict_solar_energy_array(sites['rooftop_area'], sites['orientation'], solar_irradiance)
+    wind_energy = predict_wind_energy_array(sites['wind_speed'], sites['rotor_diameter'])
+    return pd.DataFrame({
+        'solar_energy': solar_energy,
+        'wind_energy': wind_energy,
+        'recommendation': recommend_energy_source_array(solar_energy, wind_energy)
+    }, index=sites.index)
+
+# Get climate data (API Integration), through the pooled and cached provider in climate.py
 def get_climate_data(location):
-    api_url = f"https://api.openweathermap.org/data/2.5/weather?q={location}&appid=786a86a194de913c2af825ae5145edeb"
-    response = requests.get(api_url)
-    data = response.json()
-    return {
-        "solar_irradiance": data['main'].get('solar_irradiance', 5.5),  # Placeholder
-        "wind_speed": data['wind']['speed']
-    }
+    import climate
+    return climate.get_default_provider().fetch(location)
+
+# Climate data for many locations at once, one request per distinct location
+def get_climate_data_many(locations):
+    import climate
+    return climate.fetch_many(climate.get_default_provider(), locations)
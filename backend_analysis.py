@@ -1,119 +1,113 @@
 # backend_analysis.py
+# XGBoost, SciPy (allocation), geopandas and matplotlib (maps) are imported on
+# first use by the functions that need them, not when this module is imported.
 import pandas as pd
-from sklearn.model_selection import train_test_split
-import xgboost as xgb
-from sklearn.metrics import mean_squared_error, r2_score
-import pulp
 import numpy as np
-import geopandas as gpd
-import matplotlib.pyplot as plt
-import os
+from feature_store import STORE_FEATURES
+from instrumentation import instrumented
+from pipeline import DATASET_PATH, FEATURE_COLUMNS, MODEL_PARAMS, fit_model, get_context, read_dataset_csv
+
+# Calendar features plus the FeatureStore's history, holiday and ACORN features
+EXTENDED_FEATURE_COLUMNS = FEATURE_COLUMNS + STORE_FEATURES
+
+
+# The dataset is shared with backend.py through the pipeline context and loaded once
+@instrumented('load_dataset', rows_from=len)
+def load_dataset(use_cache=True):
+    if use_cache:
+        return get_context().dataset()
+    return read_dataset_csv(DATASET_PATH)
+
+# Pass a FeatureStore to train on the lag, rolling-window, holiday and ACORN features as well
+def train_model(df, store=None):
+    if store is not None:
+        store.sync(df)
+        xgb_model, metrics = fit_model(store.training_frame(df), features=EXTENDED_FEATURE_COLUMNS)
+    else:
+        xgb_model, metrics = fit_model(df)
+    print(f'Root Mean Squared Error: {metrics["rmse"]}')
+    print(f'R-squared: {metrics["r2"]}')
 
+    return xgb_model
 
-def load_dataset():
-    # Load your dataset
-    df = pd.read_csv(r'datasets\daily_dataset.csv')
-
-    # Convert 'day' column to datetime
-    df['day'] = pd.to_datetime(df['day'], format='%d-%m-%Y')
-
-    # Extract features
-    df['day_of_week'] = df['day'].dt.dayofweek
-    df['month'] = df['day'].dt.month
-    df['day_of_month'] = df['day'].dt.day
-    df['year'] = df['day'].dt.year
-
-    # Convert LCLid to categorical codes
-    df['LCLid'] = df['LCLid'].astype('category').cat.codes
-
-    df.dropna(inplace=True)
-    
-    return df
-
-def train_model(df):
-    # Define features and target
-    X = df[['LCLid', 'day_of_week', 'month', 'day_of_month', 'year']]
-    y = df['energy_median']
-
-    # Split the dataset into training and testing sets
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-    # Initialize and train XGBoost model
-    xgb_model = xgb.XGBRegressor(objective='reg:squarederror', n_estimators=150, learning_rate=0.2)
-    xgb_model.fit(X_train, y_train)
-
-    # Make predictions
-    y_pred_xgb = xgb_model.predict(X_test)
+# Reuse the stored model for this dataset and config, training only when either changed
+@instrumented('load_model')
+def load_or_train_model(df, params=MODEL_PARAMS, store=None):
+    if store is not None:
+        store.sync(df)
+        xgb_model, metadata = get_context().model(params, store.training_frame(df), EXTENDED_FEATURE_COLUMNS)
+    else:
+        xgb_model, metadata = get_context().model(params, df)
+    print(f'Root Mean Squared Error: {metadata["metrics"]["rmse"]}')
+    print(f'R-squared: {metadata["metrics"]["r2"]}')
 
-    # Evaluate the model
-    mse = mean_squared_error(y_test, y_pred_xgb)
-    rmse = np.sqrt(mse)
-    print(f'Root Mean Squared Error: {rmse}')
-    
-    r2 = r2_score(y_test, y_pred_xgb)
-    print(f'R-squared: {r2}')
-    
     return xgb_model
 
+# Build one feature matrix covering every (date, household) pair, date-major
+@instrumented('features', rows_from=len)
+def build_feature_matrix(lclids, dates):
+    lclids = np.asarray(lclids)
+    dates = pd.DatetimeIndex(pd.to_datetime(dates))
+    n_households = len(lclids)
+
+    features_df = pd.DataFrame({
+        'LCLid': np.tile(lclids, len(dates)),
+        'day_of_week': np.repeat(dates.dayofweek.to_numpy(dtype='int64'), n_households),
+        'month': np.repeat(dates.month.to_numpy(dtype='int64'), n_households),
+        'day_of_month': np.repeat(dates.day.to_numpy(dtype='int64'), n_households),
+        'year': np.repeat(dates.year.to_numpy(dtype='int64'), n_households)
+    }, columns=FEATURE_COLUMNS)
+    return features_df
+
+# Predict demand for every household on every requested date with a single model call.
+# Models trained with a FeatureStore need the same store here.
+@instrumented('predict', rows_from=len)
+def predict_demand_batch(df, dates, model, store=None):
+    lclids = df['LCLid'].unique()
+    dates = pd.DatetimeIndex(pd.to_datetime(dates))
+
+    features_df = build_feature_matrix(lclids, dates)
+    if store is not None:
+        features_df = pd.concat([features_df, store.prediction_features(lclids, dates)], axis=1)
+    predictions = model.predict(features_df)
+
+    predicted_demand_df = pd.DataFrame({
+        'LCLid': features_df['LCLid'].to_numpy(),
+        'day': np.repeat(dates.to_numpy(), len(lclids)),
+        'predicted_energy': predictions.astype('float64')
+    })
+    predicted_demand_df.attrs = dict(df.attrs)
+    return predicted_demand_df
+
 # Calculate predicted demand for each area on the same day in previous years
-def calculate_predicted_demand(df, selected_date, model):
+def calculate_predicted_demand(df, selected_date, model, store=None):
     # Ensure selected_date is in datetime format
     selected_date = pd.to_datetime(selected_date)
-    
-    predicted_demand = []
-    for lclid in df['LCLid'].unique():
-        # Extract features for the selected date
-        features = {
-            'LCLid': [lclid],  # Include LCLid as a feature
-            'day_of_week': [selected_date.dayofweek],
-            'month': [selected_date.month],
-            'day_of_month': [selected_date.day],
-            'year': [selected_date.year]
-        }
-        features_df = pd.DataFrame(features)
-        
-        # Predict demand for the locality using the trained model
-        prediction = model.predict(features_df)[0]
-        predicted_demand.append({'LCLid': lclid, 'predicted_energy': prediction})
-    
-    # Convert the list of dictionaries to a DataFrame
-    predicted_demand_df = pd.DataFrame(predicted_demand)
-    return predicted_demand_df
-
-# Function to solve the LP problem with weighted allocation
-def solve_lp_problem(area_avg_demand, total_generated):
-    # Initialize the LP problem
-    lp_problem = pulp.LpProblem("Electricity_Distribution", pulp.LpMinimize)
-
-    # Define decision variables for each area
-    allocation = {area: pulp.LpVariable(f"allocation_{area}", lowBound=0) for area in area_avg_demand.index}
 
-    # Objective function: Minimize the total amount of allocated energy (just to define a solvable LP)
-    lp_problem += pulp.lpSum([allocation[area] for area in area_avg_demand.index])
+    predicted_demand_df = predict_demand_batch(df, [selected_date], model, store)
+    return predicted_demand_df[['LCLid', 'predicted_energy']]
 
-    # Add constraint: Total allocated energy should not exceed the total generated energy
-    lp_problem += pulp.lpSum([allocation[area] for area in area_avg_demand.index]) <= total_generated
+# Allocate generated energy across areas proportionally to their demand.
+# Extra constraints (caps, priorities, feeders/feeder_limits, floors) switch to the LP engine.
+@instrumented('solve', rows_from=len)
+def solve_lp_problem(area_avg_demand, total_generated, **constraints):
+    import allocation as allocation_engine
 
-    # Add constraints: Allocate energy proportionally based on historical average demand
-    total_avg_demand = area_avg_demand.sum()
-    for area, avg_demand in area_avg_demand.items():
-        # Ensure each area gets at least a proportionate share of energy
-        proportionate_share = (avg_demand / total_avg_demand) * total_generated
-        lp_problem += allocation[area] >= proportionate_share
-
-    # Solve the problem
-    lp_problem.solve()
+    # Solve time is recorded by the 'solve' span, the path taken by the 'allocations' counter
+    allocation, _ = allocation_engine.allocate(area_avg_demand.to_numpy(), total_generated, **constraints)
 
     # Return the allocation results
-    result = {area: allocation[area].varValue for area in area_avg_demand.index}
+    result = dict(zip(area_avg_demand.index, allocation.tolist()))
     return result
 
 # Compare the allocated energy with historical demand
 def evaluate_allocation(allocation_result, area_avg_demand_same_day):
+    import allocation as allocation_engine
+
     sufficiency_report = {}
     for area, allocated_energy in allocation_result.items():
         historical_demand = area_avg_demand_same_day.get(area, 0)
-        sufficiency = "Sufficient" if allocated_energy >= historical_demand else "Insufficient"
+        sufficiency = "Sufficient" if allocation_engine.covers(allocated_energy, historical_demand) else "Insufficient"
         sufficiency_report[area] = {
             "Allocated Energy": allocated_energy,
             "Historical Demand": historical_demand,
@@ -121,79 +115,51 @@ def evaluate_allocation(allocation_result, area_avg_demand_same_day):
         }
     return sufficiency_report
 
-def distribute_energy(total_generated, predicted_demand_df):
+def distribute_energy(total_generated, predicted_demand_df, **constraints):
     
     # Convert the predicted demand DataFrame into a Series for compatibility
     area_avg_demand_same_day = predicted_demand_df.set_index('LCLid')['predicted_energy']
 
-    allocation_result = solve_lp_problem(area_avg_demand_same_day, total_generated)
+    allocation_result = solve_lp_problem(area_avg_demand_same_day, total_generated, **constraints)
     sufficiency_report = evaluate_allocation(allocation_result, area_avg_demand_same_day)
 
     allocation_result = pd.DataFrame(list(allocation_result.items()), columns=['LCLid', 'allocated_energy'])
+    allocation_result.attrs = dict(predicted_demand_df.attrs)
     return allocation_result
 
-def save_map_image(gdf, column_name, title, filename):
-    fig, ax = plt.subplots(1, 1, figsize=(10, 10))
-    gdf.plot(ax=ax, column=column_name, cmap='Reds', legend=True, missing_kwds={"color": "lightgrey"})
-    plt.title(title)
-    plt.savefig(filename)
-    plt.close()
+# Colour each London polygon by the mean value of the households located inside it
+def generate_map(values_df, column_name, title, filename):
+    import map_render
+    map_render.render_values(values_df, column_name, title).save(filename)
+    return filename
 
 def generate_prediction_map(predicted_demand_df):
-    shapefile_path = r"C:\Users\BHAVYA C SHETTY\OneDrive\Desktop\PROJECT\rmipr\datasets\london_shapefile"
-    gdf = gpd.read_file(shapefile_path)
-
-    # Load the datasets
-    daily_dataset = predicted_demand_df
-    synthetic_coordinates = pd.read_csv(r'datasets\synthetic_locality_coordinates.csv')
-
-    # Randomly select 983 LCLid entries
-    selected_lclids = daily_dataset['LCLid'].sample(n=983, random_state=40)
-
-    # Merge with the energy data to get the relevant columns
-    selected_data = daily_dataset[daily_dataset['LCLid'].isin(selected_lclids)]
-
-    # Merge synthetic coordinates with selected data
-    selected_coordinates = synthetic_coordinates[synthetic_coordinates['LCLid'].isin(selected_lclids)]
-    selected_gdf = gpd.GeoDataFrame(selected_coordinates, geometry=gpd.points_from_xy(selected_coordinates.longitude, selected_coordinates.latitude))
-
-    # Assign the selected points to the polygons
-    gdf['energy_mean'] = np.nan  # Initialize with NaN
-
-    for i in range(len(gdf)):
-        gdf.at[i, 'energy_mean'] = selected_data.iloc[i]['predicted_energy']
-
-    # Save the plot as an image
     filename = r'outputs\prediction_map.png'
-    save_map_image(gdf, 'energy_mean', 'Heatmap of Energy Usage in London', filename)
-    return filename
+    return generate_map(predicted_demand_df, 'predicted_energy', 'Heatmap of Energy Usage in London', filename)
 
 def generate_distribution_map(allocation_result_df):
-    shapefile_path = r'C:\Users\BHAVYA C SHETTY\OneDrive\Desktop\PROJECT\rmipr\datasets\london_shapefile'
-    gdf = gpd.read_file(shapefile_path)
-
-    # Load the datasets
-    daily_dataset = allocation_result_df
-    synthetic_coordinates = pd.read_csv(r'datasets\synthetic_locality_coordinates.csv')
-
-    # Randomly select 983 LCLid entries
-    selected_lclids = daily_dataset['LCLid'].sample(n=983, random_state=40)
-
-    # Merge with the energy data to get the relevant columns
-    selected_data = daily_dataset[daily_dataset['LCLid'].isin(selected_lclids)]
-
-    # Merge synthetic coordinates with selected data
-    selected_coordinates = synthetic_coordinates[synthetic_coordinates['LCLid'].isin(selected_lclids)]
-    selected_gdf = gpd.GeoDataFrame(selected_coordinates, geometry=gpd.points_from_xy(selected_coordinates.longitude, selected_coordinates.latitude))
-
-    # Assign the selected points to the polygons
-    gdf['energy_mean'] = np.nan  # Initialize with NaN
-
-    for i in range(len(gdf)):
-        gdf.at[i, 'energy_mean'] = selected_data.iloc[i]['allocated_energy']
-
-    # Save the plot as an image
     filename = r'outputs\distribution_map.png'
-    save_map_image(gdf, 'energy_mean', 'Heatmap of Energy Distribution in London', filename)
-    return filename
-
+    return generate_map(allocation_result_df, 'allocated_energy', 'Heatmap of Energy Distribution in London', filename)
+
+# Digest of the households and values a map is drawn from, so a retrained model, another
+# feature store or a different household set never reuses a map cached for the same date
+def _map_values_key(values_df, column_name):
+    import hashlib
+    hasher = hashlib.sha1(np.ascontiguousarray(values_df['LCLid'].to_numpy()).tobytes())
+    hasher.update(np.ascontiguousarray(values_df[column_name].to_numpy(dtype='float64')).tobytes())
+    return hasher.hexdigest()
+
+# In-memory map images for the GUIs, cached per (date, mode, generated energy, values)
+def prediction_map_image(predicted_demand_df, selected_date):
+    import map_render
+    key = (pd.Timestamp(selected_date).normalize(), 'prediction', None,
+           _map_values_key(predicted_demand_df, 'predicted_energy'))
+    return map_render.cached_image(key, lambda: map_render.render_values(
+        predicted_demand_df, 'predicted_energy', 'Heatmap of Energy Usage in London'))
+
+def distribution_map_image(allocation_result_df, selected_date, generated_energy):
+    import map_render
+    key = (pd.Timestamp(selected_date).normalize(), 'distribution', float(generated_energy),
+           _map_values_key(allocation_result_df, 'allocated_energy'))
+    return map_render.cached_image(key, lambda: map_render.render_values(
+        allocation_result_df, 'allocated_energy', 'Heatmap of Energy Distribution in London'))
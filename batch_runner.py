@@ -0,0 +1,146 @@
+# batch_runner.py
+# Headless forecasts and allocations for scheduled jobs.
+# Predicts demand for every date in a range and allocates each generated-energy
+# scenario, with dates processed by a pool of worker threads that share the dataset
+# and model loaded once (from the columnar cache and the model store). Each stage
+# (load, features, predict, solve, render, export) is timed and summarised.
+#
+#   python batch_runner.py --start 2014-01-01 --end 2014-01-31 --generated 4000 5000 6000 --workers 4
+import argparse
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import allocation as allocation_engine
+import instrumentation
+import map_render
+from backend_analysis import build_feature_matrix, distribute_energy, load_dataset, load_or_train_model
+from export import export_frame
+
+STAGES = ['load', 'features', 'predict', 'solve', 'render', 'export']
+OUTPUT_DIR = os.path.join('outputs', 'batch')
+
+
+class StageTimer:
+    def __init__(self):
+        self.seconds = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.seconds[stage].append(seconds)
+
+    def time(self, stage, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.record(stage, time.perf_counter() - start)
+        return result
+
+    def summary(self):
+        with self._lock:
+            return {
+                stage: {
+                    'calls': len(self.seconds[stage]),
+                    'total_seconds': float(np.sum(self.seconds[stage])),
+                    'mean_seconds': float(np.mean(self.seconds[stage])),
+                    'p95_seconds': float(np.percentile(self.seconds[stage], 95))
+                }
+                for stage in STAGES if self.seconds[stage]
+            }
+
+
+# Prediction plus one allocation per scenario for a single date
+def run_date(df, model, lclids, selected_date, scenarios, output_dir, timer, fmt='parquet', render=True):
+    date_dir = os.path.join(output_dir, selected_date.strftime('%Y-%m-%d'))
+    os.makedirs(date_dir, exist_ok=True)
+
+    features_df = timer.time('features', build_feature_matrix, lclids, [selected_date])
+    predictions = timer.time('predict', model.predict, features_df)
+    predicted_demand_df = pd.DataFrame({'LCLid': lclids, 'predicted_energy': predictions.astype('float64')})
+    predicted_demand_df.attrs = dict(df.attrs)
+
+    if render:
+        image = timer.time('render', map_render.render_values, predicted_demand_df, 'predicted_energy',
+                           f'Heatmap of Energy Usage in London, {selected_date:%Y-%m-%d}')
+        timer.time('render', image.save, os.path.join(date_dir, 'prediction_map.png'))
+    timer.time('export', export_frame, predicted_demand_df, os.path.join(date_dir, f'prediction.{fmt}'))
+
+    total_demand = float(predictions.sum())
+    results = []
+    for generated_energy in scenarios:
+        allocation_result_df = timer.time('solve', distribute_energy, generated_energy, predicted_demand_df)
+        name = f'allocation_{generated_energy:g}'
+        if render:
+            image = timer.time('render', map_render.render_values, allocation_result_df, 'allocated_energy',
+                               f'Heatmap of Energy Distribution in London, {selected_date:%Y-%m-%d}')
+            timer.time('render', image.save, os.path.join(date_dir, f'{name}_map.png'))
+        timer.time('export', export_frame, allocation_result_df, os.path.join(date_dir, f'{name}.{fmt}'))
+
+        results.append({
+            'date': selected_date.strftime('%Y-%m-%d'),
+            'generated_energy': generated_energy,
+            'predicted_demand': total_demand,
+            # Same rule as the GUI's sufficiency report: every household's demand is covered
+            'sufficient': bool(allocation_engine.covers(allocation_result_df['allocated_energy'].to_numpy(),
+                                                        predictions).all())
+        })
+    return results
+
+
+def run_batch(start_date, end_date, scenarios, workers=4, output_dir=OUTPUT_DIR, fmt='parquet', render=True):
+    timer = StageTimer()
+    start = time.perf_counter()
+    df = timer.time('load', load_dataset)
+    model = timer.time('load', load_or_train_model, df)
+    lclids = df['LCLid'].unique()
+
+    dates = pd.date_range(pd.to_datetime(start_date), pd.to_datetime(end_date), freq='D')
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_date, df, model, lclids, d, scenarios, output_dir, timer, fmt, render) for d in dates]
+        results = [row for future in futures for row in future.result()]
+
+    summary = {
+        'start': str(dates[0].date()) if len(dates) else None,
+        'end': str(dates[-1].date()) if len(dates) else None,
+        'dates': len(dates),
+        'scenarios': list(scenarios),
+        'households': len(lclids),
+        'workers': workers,
+        'wall_seconds': time.perf_counter() - start,
+        'stages': timer.summary(),
+        'results': results
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    instrumentation.write_prometheus(os.path.join(output_dir, 'metrics.prom'))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run forecasts and allocations over a date range without the GUI')
+    parser.add_argument('--start', required=True, help='first date, YYYY-MM-DD')
+    parser.add_argument('--end', required=True, help='last date, YYYY-MM-DD')
+    parser.add_argument('--generated', type=float, nargs='+', default=[], help='generated-energy scenarios')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--output', default=OUTPUT_DIR)
+    parser.add_argument('--format', choices=['parquet', 'csv.gz', 'arrow', 'xlsx'], default='parquet')
+    parser.add_argument('--no-render', action='store_true', help='skip the map images')
+    args = parser.parse_args()
+
+    summary = run_batch(args.start, args.end, args.generated, args.workers, args.output, args.format,
+                        render=not args.no_render)
+    print(f'{summary["dates"]} dates x {len(summary["scenarios"])} scenarios in {summary["wall_seconds"]:.1f} s')
+    for stage, stats in summary['stages'].items():
+        print(f'  {stage:<9} {stats["calls"]:>6} calls  total {stats["total_seconds"]:8.2f} s  '
+              f'mean {stats["mean_seconds"] * 1000:8.1f} ms  p95 {stats["p95_seconds"] * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+# bench_features.py
+# Time an incremental FeatureStore update against a full rebuild and check they agree
+import argparse
+import tempfile
+
+import numpy as np
+
+from bench_prediction import make_dataset
+from feature_store import HISTORY_FEATURES, FeatureStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark incremental vs full feature computation')
+    parser.add_argument('--households', type=int, default=5566)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--new-days', type=int, default=1, help='days appended in the incremental update')
+    args = parser.parse_args()
+
+    df = make_dataset(args.households, args.days)
+    cutoff = df['day'].max() - np.timedelta64(args.new_days, 'D')
+    history, new_rows = df[df['day'] <= cutoff], df[df['day'] > cutoff]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        full = FeatureStore(cache_dir=f'{tmp}/full')
+        full_timing = full.rebuild(df)
+
+        incremental = FeatureStore(cache_dir=f'{tmp}/incremental')
+        incremental.rebuild(history)
+        update_timing = incremental.update(new_rows)
+
+    keys = ['LCLid', 'day']
+    expected = full.features.sort_values(keys).reset_index(drop=True)
+    actual = incremental.features.sort_values(keys).reset_index(drop=True)
+    np.testing.assert_array_equal(expected[keys].to_numpy(), actual[keys].to_numpy())
+    np.testing.assert_allclose(expected[HISTORY_FEATURES].to_numpy(), actual[HISTORY_FEATURES].to_numpy(), rtol=1e-6)
+
+    print(f'Full rebuild ({full_timing["rows"]} rows):        {full_timing["seconds"]:.3f} s')
+    print(f'Incremental update ({update_timing["rows"]} rows): {update_timing["seconds"]:.3f} s '
+          f'({full_timing["seconds"] / update_timing["seconds"]:.1f}x faster)')
+    print('Incremental features match the full rebuild.')
+
+
+if __name__ == '__main__':
+    main()
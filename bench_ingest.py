@@ -0,0 +1,70 @@
+# bench_ingest.py
+# Report load time and peak RSS of the CSV loader against the columnar cache.
+# Each mode runs in a fresh interpreter so peak RSS is not shared between them.
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+MODES = {
+    'csv': 'backend.load_dataset(use_cache=False)',
+    'cache_build': 'data_cache.build_cache(backend.DATASET_PATH, data_cache.cache_dir_for(backend.DATASET_PATH))',
+    'cache_load': 'backend.load_dataset(use_cache=True)'
+}
+
+CHILD_TEMPLATE = '''
+import json, sys, time
+import backend, data_cache
+start = time.perf_counter()
+result = {call}
+elapsed = time.perf_counter() - start
+try:
+    import resource
+except ImportError:  # Windows: peak working set from psutil, if installed
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        peak_mb = getattr(info, 'peak_wset', info.rss) / 2**20
+    except ImportError:
+        peak_mb = None
+else:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    peak_mb = peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+rows = len(result) if hasattr(result, '__len__') and not isinstance(result, dict) else result.get('rows')
+print(json.dumps({{'seconds': elapsed, 'peak_rss_mb': peak_mb, 'rows': rows}}))
+'''
+
+
+def run_mode(mode):
+    code = CHILD_TEMPLATE.format(call=MODES[mode])
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark daily_dataset.csv ingestion')
+    parser.add_argument('--repeat', type=int, default=3, help='warm cache loads to average')
+    args = parser.parse_args()
+
+    results = {'csv': run_mode('csv'), 'cache_build': run_mode('cache_build')}
+    loads = [run_mode('cache_load') for _ in range(args.repeat)]
+    results['cache_load'] = {
+        'seconds': sum(r['seconds'] for r in loads) / len(loads),
+        'peak_rss_mb': max((r['peak_rss_mb'] for r in loads if r['peak_rss_mb'] is not None), default=None),
+        'rows': loads[0]['rows']
+    }
+
+    print(f'{"mode":<12} {"rows":>10} {"seconds":>9} {"peak RSS (MB)":>14}')
+    for mode, r in results.items():
+        peak = 'n/a' if r['peak_rss_mb'] is None else f'{r["peak_rss_mb"]:.1f}'
+        print(f'{mode:<12} {r["rows"]:>10} {r["seconds"]:>9.3f} {peak:>14}')
+
+    speedup = results['csv']['seconds'] / results['cache_load']['seconds']
+    print(f'Cached load is {speedup:.1f}x faster than parsing the CSV')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+# bench_pipeline.py
+# End-to-end benchmark of load -> train -> predict -> allocate -> render on synthetic
+# data at 1x, 10x and 100x a base household count. Every scale runs in a fresh
+# interpreter so peak RSS is not shared between them, and each result is appended to
+# a JSONL history file and compared with the previous run at the same size.
+#
+#   python bench_pipeline.py --base-households 556 --days 90
+#   python bench_pipeline.py --scales 1 10 --history benchmarks/pipeline_history.jsonl
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+WORK_DIR = 'bench_data'
+HISTORY_PATH = os.path.join('benchmarks', 'pipeline_history.jsonl')
+STAGES = ['generate', 'load_csv', 'load_cached', 'train', 'predict', 'allocate', 'spatial_join', 'render']
+HORIZON_DAYS = 7
+
+
+def _shapefile_path():
+    import geo_index
+    if os.path.exists(os.path.join(geo_index.SHAPEFILE_PATH, 'london.shp')):
+        return geo_index.SHAPEFILE_PATH
+    return None
+
+
+# One scale, inside the child interpreter; returns the result dict
+def run_scale(n_households, n_days, seed, work_dir):
+    import numpy as np
+    import pandas as pd
+
+    import data_cache
+    import geo_index
+    import map_render
+    import synthetic_data
+    from backend_analysis import distribute_energy, predict_demand_batch
+    from pipeline import fit_model, read_dataset_csv
+    from streaming_train import peak_rss_mb
+
+    seconds = {}
+
+    def timed(stage, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        seconds[stage] = time.perf_counter() - start
+        return result
+
+    data_dir = os.path.join(work_dir, f'h{n_households}_d{n_days}_s{seed}')
+    csv_path = os.path.join(data_dir, 'daily_dataset.csv')
+    if not os.path.exists(csv_path):
+        timed('generate', synthetic_data.generate, data_dir, n_households, n_days, seed=seed)
+
+    cache_root = os.path.join(data_dir, '.cache')
+    df = timed('load_csv', read_dataset_csv, csv_path)
+    data_cache.load_daily_dataset(csv_path, cache_root)  # build the columnar cache outside the timing
+    df = timed('load_cached', data_cache.load_daily_dataset, csv_path, cache_root)
+
+    model, metrics = timed('train', fit_model, df)
+
+    dates = pd.date_range(df['day'].max() + pd.Timedelta(days=1), periods=HORIZON_DAYS, freq='D')
+    predicted = timed('predict', predict_demand_batch, df, dates, model)
+    first_day = predicted[predicted['day'] == dates[0]][['LCLid', 'predicted_energy']]
+    first_day.attrs = dict(predicted.attrs)
+    allocation_result_df = timed('allocate', distribute_energy, 0.9 * first_day['predicted_energy'].sum(), first_day)
+
+    shapefile = _shapefile_path()
+    if shapefile is not None:
+        geo_index.SHAPEFILE_PATH = shapefile
+        geo_index.COORDINATES_PATH = os.path.join(data_dir, 'synthetic_locality_coordinates.csv')
+        geo_index.JOIN_CACHE_PATH = os.path.join(cache_root, 'household_polygons.csv')
+        timed('spatial_join', geo_index.household_polygons)
+        timed('render', map_render.render_values, allocation_result_df, 'allocated_energy', 'Benchmark')
+
+    return {
+        'households': n_households,
+        'days': n_days,
+        'rows': len(df),
+        'predicted_rows': len(predicted),
+        'stages': seconds,
+        'metrics': metrics,
+        'peak_rss_mb': peak_rss_mb(),
+        'checksum': float(np.round(predicted['predicted_energy'].sum(), 3))
+    }
+
+
+def run_in_child(n_households, n_days, seed, work_dir):
+    code = (f'import json, bench_pipeline; '
+            f'print(json.dumps(bench_pipeline.run_scale({n_households}, {n_days}, {seed}, {work_dir!r})))')
+    completed = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f'Scale {n_households} failed:\n{completed.stderr}')
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def read_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous_run(history, result):
+    matches = [h for h in history if h['households'] == result['households'] and h['days'] == result['days']]
+    return matches[-1] if matches else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the full pipeline on synthetic data at several scales')
+    parser.add_argument('--base-households', type=int, default=556)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--work-dir', default=WORK_DIR, help='where the generated datasets are kept between runs')
+    parser.add_argument('--history', default=HISTORY_PATH)
+    args = parser.parse_args()
+
+    history = read_history(args.history)
+    run = {
+        'run_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count()
+    }
+
+    os.makedirs(os.path.dirname(args.history) or '.', exist_ok=True)
+    for scale in args.scales:
+        result = {**run, 'scale': scale, **run_in_child(args.base_households * scale, args.days, args.seed, args.work_dir)}
+        before = previous_run(history, result)
+        with open(args.history, 'a') as f:
+            f.write(json.dumps(result) + '\n')
+
+        peak = 'n/a' if result['peak_rss_mb'] is None else f'{result["peak_rss_mb"]:.0f} MB'
+        print(f'{scale}x: {result["households"]} households, {result["rows"]} rows, '
+              f'peak RSS {peak}, RMSE {result["metrics"]["rmse"]:.4f}')
+        for stage in STAGES:
+            if stage not in result['stages']:
+                continue
+            line = f'    {stage:<13} {result["stages"][stage]:9.3f} s'
+            if before is not None and before['stages'].get(stage):
+                line += f'   ({result["stages"][stage] / before["stages"][stage]:.2f}x vs {before["run_at"]})'
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
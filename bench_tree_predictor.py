@@ -0,0 +1,61 @@
+# bench_tree_predictor.py
+# Compare the NumPy tree predictor against XGBoost's own predict for accuracy,
+# single-row latency and batch throughput
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import xgboost as xgb
+
+from backend_analysis import FEATURE_COLUMNS, build_feature_matrix
+from bench_prediction import make_dataset
+from pipeline import MODEL_PARAMS
+from tree_predictor import TreePredictor
+
+
+def per_call_ms(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the NumPy tree predictor against XGBoost')
+    parser.add_argument('--households', type=int, default=5566)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--horizon', type=int, default=7, help='dates in the batch prediction')
+    parser.add_argument('--repeats', type=int, default=200, help='single-row predictions timed')
+    args = parser.parse_args()
+
+    df = make_dataset(args.households, args.days)
+    model = xgb.XGBRegressor(**MODEL_PARAMS)
+    model.fit(df[FEATURE_COLUMNS], df['energy_median'])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f'{tmp}/trees.npz'
+        TreePredictor.from_model(model).save(path)
+        predictor = TreePredictor.load(path)
+
+    features_df = build_feature_matrix(df['LCLid'].unique(), np.datetime64('2013-06-15') + np.arange(args.horizon))
+    features = features_df.to_numpy(dtype='float32')
+
+    expected = model.predict(features_df)
+    actual = predictor.predict(features)
+    np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-5)
+    print(f'Max abs difference vs XGBoost over {len(features)} rows: {np.abs(actual - expected).max():.2e}')
+
+    row_df, row = features_df.iloc[:1], features[:1]
+    native_ms = per_call_ms(lambda: model.predict(row_df), args.repeats)
+    numpy_ms = per_call_ms(lambda: predictor.predict(row), args.repeats)
+    print(f'Single row: XGBoost {native_ms:.3f} ms, NumPy {numpy_ms:.3f} ms ({native_ms / numpy_ms:.1f}x)')
+
+    native_s = per_call_ms(lambda: model.predict(features_df), 5) / 1000
+    numpy_s = per_call_ms(lambda: predictor.predict(features), 5) / 1000
+    print(f'Batch of {len(features)} rows: XGBoost {len(features) / native_s:,.0f} rows/s, '
+          f'NumPy {len(features) / numpy_s:,.0f} rows/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+# block_ingest.py
+# Parallel ingestion of the smart-meter block files into a partitioned Parquet store.
+# Each block file listed in informations_households.csv is read by a worker process,
+# joined with the household metadata (stdorToU, Acorn, Acorn_grouped as categoricals)
+# and written as one Parquet file per ACORN group:
+#
+#   <store>/Acorn_grouped=<group>/<block>.parquet
+#
+# Queries for some households or ACORN groups then open only the partitions that can
+# contain them. Blocks whose source file is unchanged are skipped on re-ingestion.
+#
+#   python block_ingest.py --blocks-dir datasets/daily_dataset --store datasets/store --kind daily
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import data_cache
+
+HOUSEHOLDS_PATH = 'informations_households.csv'
+METADATA_COLUMNS = ['stdorToU', 'Acorn', 'Acorn_grouped']
+PARTITION_COLUMN = 'Acorn_grouped'
+MANIFEST_FILENAME = 'manifest.json'
+UNKNOWN_GROUP = 'unknown'  # partition for households missing from the metadata
+
+
+def load_households(households_path=HOUSEHOLDS_PATH):
+    households = pd.read_csv(households_path)
+    for column in ['LCLid'] + METADATA_COLUMNS:
+        households[column] = households[column].astype('category')
+    return households
+
+
+def partition_dir(store_dir, group):
+    return os.path.join(store_dir, f'{PARTITION_COLUMN}={group}')
+
+
+def _read_block(path, kind, day_format):
+    if kind == 'daily':
+        df = pd.read_csv(path)
+        df['day'] = pd.to_datetime(df['day'], format=day_format)
+        energy_columns = [c for c in df.columns if c.startswith('energy_')]
+    else:
+        df = pd.read_csv(path).rename(columns={'energy(kWh/hh)': 'energy'})
+        df['tstp'] = pd.to_datetime(df['tstp'])
+        df['energy'] = pd.to_numeric(df['energy'], errors='coerce')
+        energy_columns = ['energy']
+    for column in energy_columns:
+        df[column] = df[column].astype('float32')
+    return df
+
+
+# Worker: read one block, attach household metadata and write one file per ACORN group
+def ingest_block(path, store_dir, kind, day_format, households_path):
+    block = os.path.splitext(os.path.basename(path))[0]
+    households = load_households(households_path)
+
+    df = _read_block(path, kind, day_format)
+    df['LCLid'] = pd.Categorical(df['LCLid'], categories=households['LCLid'].cat.categories)
+    df = df.merge(households[['LCLid'] + METADATA_COLUMNS], on='LCLid', how='left')
+    if df[PARTITION_COLUMN].isna().any():
+        df[PARTITION_COLUMN] = df[PARTITION_COLUMN].cat.add_categories(UNKNOWN_GROUP).fillna(UNKNOWN_GROUP)
+
+    groups = []
+    for group, part in df.groupby(PARTITION_COLUMN, observed=True):
+        out_dir = partition_dir(store_dir, group)
+        os.makedirs(out_dir, exist_ok=True)
+        part.drop(columns=PARTITION_COLUMN).to_parquet(os.path.join(out_dir, f'{block}.parquet'), index=False)
+        groups.append(str(group))
+    return {'block': block, 'rows': len(df), 'groups': groups, 'source': data_cache.source_signature(path)}
+
+
+def read_manifest(store_dir):
+    path = os.path.join(store_dir, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return {'blocks': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(store_dir, manifest):
+    tmp_path = os.path.join(store_dir, MANIFEST_FILENAME + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(store_dir, MANIFEST_FILENAME))
+
+
+# Ingest every changed block file with a process pool and record it in the store manifest
+def ingest_blocks(blocks_dir, store_dir, kind='daily', day_format='%d-%m-%Y', households_path=HOUSEHOLDS_PATH,
+                  max_workers=None):
+    households = pd.read_csv(households_path, usecols=['file'])
+    files = sorted(households['file'].unique(), key=lambda f: int(f.split('_')[-1]))
+    paths = [os.path.join(blocks_dir, f'{name}.csv') for name in files]
+    paths = [p for p in paths if os.path.exists(p)]
+
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = read_manifest(store_dir)
+    manifest['kind'] = kind
+    pending = [
+        p for p in paths
+        if manifest['blocks'].get(os.path.splitext(os.path.basename(p))[0], {}).get('source') != data_cache.source_signature(p)
+    ]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(ingest_block, p, store_dir, kind, day_format, households_path) for p in pending]
+        for future in as_completed(futures):
+            result = future.result()
+            manifest['blocks'][result['block']] = result
+    write_manifest(store_dir, manifest)
+
+    return {
+        'blocks_found': len(paths),
+        'blocks_ingested': len(pending),
+        'rows_ingested': sum(manifest['blocks'][os.path.splitext(os.path.basename(p))[0]]['rows'] for p in pending),
+        'seconds': time.perf_counter() - start
+    }
+
+
+# Partition files that can hold the requested households and/or ACORN groups
+def partition_files(store_dir, lclids=None, acorn_groups=None, households_path=HOUSEHOLDS_PATH):
+    manifest = read_manifest(store_dir)
+    if lclids is not None:
+        households = pd.read_csv(households_path, usecols=['LCLid', 'Acorn_grouped', 'file'])
+        selected = households[households['LCLid'].isin(list(lclids))]
+        if acorn_groups is not None:
+            selected = selected[selected['Acorn_grouped'].isin(list(acorn_groups))]
+        candidates = set(zip(selected['Acorn_grouped'], selected['file']))
+    else:
+        candidates = {
+            (group, block)
+            for block, entry in manifest['blocks'].items()
+            for group in entry['groups']
+            if acorn_groups is None or group in acorn_groups
+        }
+    paths = [os.path.join(partition_dir(store_dir, group), f'{block}.parquet') for group, block in sorted(candidates)]
+    return [p for p in paths if os.path.exists(p)]
+
+
+# Read only the partitions needed for the given households and/or ACORN groups
+def read_store(store_dir, lclids=None, acorn_groups=None, columns=None, households_path=HOUSEHOLDS_PATH):
+    filters = [('LCLid', 'in', list(lclids))] if lclids is not None else None
+    file_columns = [c for c in columns if c != PARTITION_COLUMN] if columns is not None else None
+    frames = []
+    for path in partition_files(store_dir, lclids, acorn_groups, households_path):
+        part = pd.read_parquet(path, columns=file_columns, filters=filters)
+        group = os.path.basename(os.path.dirname(path)).split('=', 1)[1]
+        if columns is None or PARTITION_COLUMN in columns:
+            part[PARTITION_COLUMN] = group
+        frames.append(part)
+    if not frames:
+        return pd.DataFrame(columns=columns)
+
+    df = pd.concat(frames, ignore_index=True)
+    if PARTITION_COLUMN in df:
+        df[PARTITION_COLUMN] = df[PARTITION_COLUMN].astype('category')
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingest smart-meter block files into a partitioned store')
+    parser.add_argument('--blocks-dir', required=True)
+    parser.add_argument('--store', required=True)
+    parser.add_argument('--kind', choices=['daily', 'halfhourly'], default='daily')
+    parser.add_argument('--day-format', default='%d-%m-%Y', help='format of the day column in daily block files')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    summary = ingest_blocks(args.blocks_dir, args.store, args.kind, args.day_format, max_workers=args.workers)
+    print(f'Ingested {summary["blocks_ingested"]} of {summary["blocks_found"]} blocks '
+          f'({summary["rows_ingested"]} rows) in {summary["seconds"]:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+# climate.py
+# Climate data providers for the renewable estimates.
+#  - OpenWeatherMapProvider: pooled requests.Session with timeouts and retries
+#  - FixtureProvider: answers from a local JSON/CSV file, for offline and batch runs
+#  - CachedProvider: TTL cache keyed by location in front of any provider
+# fetch_many fetches many locations concurrently, each distinct location once.
+# record_fixture saves live responses to a file FixtureProvider can replay later.
+import asyncio
+import csv
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import instrumentation
+
+OPENWEATHERMAP_URL = 'https://api.openweathermap.org/data/2.5/weather'
+OPENWEATHERMAP_API_KEY = os.environ.get('OPENWEATHERMAP_API_KEY', '786a86a194de913c2af825ae5145edeb')
+
+DEFAULT_SOLAR_IRRADIANCE = 5.5  # Placeholder, the weather API does not report irradiance
+DEFAULT_TTL_SECONDS = 15 * 60
+DEFAULT_CONCURRENCY = 16
+
+
+def _normalize(location):
+    return location.strip().lower()
+
+
+class OpenWeatherMapProvider:
+    def __init__(self, api_key=OPENWEATHERMAP_API_KEY, timeout=(3.05, 10), retries=3, pool_size=DEFAULT_CONCURRENCY):
+        self.api_key = api_key
+        self.timeout = timeout
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(['GET']))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def fetch(self, location):
+        response = self.session.get(OPENWEATHERMAP_URL, params={'q': location, 'appid': self.api_key}, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        return {
+            'solar_irradiance': data['main'].get('solar_irradiance', DEFAULT_SOLAR_IRRADIANCE),
+            'wind_speed': data['wind']['speed']
+        }
+
+    def close(self):
+        self.session.close()
+
+
+# Reads {location: {"solar_irradiance": ..., "wind_speed": ...}} from a JSON file, a CSV
+# with location,solar_irradiance,wind_speed columns, or a dict. Unknown locations get
+# `default` when given, otherwise raise KeyError.
+class FixtureProvider:
+    def __init__(self, source, default=None):
+        if isinstance(source, dict):
+            records = source
+        elif str(source).lower().endswith('.csv'):
+            with open(source, newline='') as f:
+                records = {row.pop('location'): {k: float(v) for k, v in row.items() if v != ''} for row in csv.DictReader(f)}
+        else:
+            with open(source) as f:
+                records = json.load(f)
+        self.records = {_normalize(location): dict(values) for location, values in records.items()}
+        self.default = default
+
+    def fetch(self, location):
+        record = self.records.get(_normalize(location))
+        if record is None:
+            if self.default is None:
+                raise KeyError(f'No climate fixture for {location!r}')
+            record = self.default
+        return {
+            'solar_irradiance': record.get('solar_irradiance', DEFAULT_SOLAR_IRRADIANCE),
+            'wind_speed': record['wind_speed']
+        }
+
+
+class CachedProvider:
+    def __init__(self, provider, ttl=DEFAULT_TTL_SECONDS, max_entries=4096, clock=time.monotonic):
+        self.provider = provider
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def fetch(self, location):
+        key = _normalize(location)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                instrumentation.cache_hit('climate')
+                return dict(entry[1])
+            self.misses += 1
+        instrumentation.cache_miss('climate')
+
+        data = self.provider.fetch(location)
+        with self._lock:
+            self._entries[key] = (now, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return dict(data)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+async def fetch_many_async(provider, locations, concurrency=DEFAULT_CONCURRENCY):
+    semaphore = asyncio.Semaphore(concurrency)
+    unique = list(OrderedDict.fromkeys(locations))
+
+    async def fetch_one(location):
+        async with semaphore:
+            return await asyncio.to_thread(provider.fetch, location)
+
+    results = await asyncio.gather(*(fetch_one(location) for location in unique))
+    return dict(zip(unique, results))
+
+
+# {location: climate data} for every distinct location, fetched concurrently
+def fetch_many(provider, locations, concurrency=DEFAULT_CONCURRENCY):
+    return asyncio.run(fetch_many_async(provider, locations, concurrency))
+
+
+# Fetch locations from a live provider and save them as a fixture for offline replay
+def record_fixture(provider, locations, path, concurrency=DEFAULT_CONCURRENCY):
+    records = fetch_many(provider, locations, concurrency)
+    with open(path, 'w') as f:
+        json.dump(records, f, indent=2)
+    return records
+
+
+_default_provider = None
+_default_lock = threading.Lock()
+
+
+# Provider used by backend.get_climate_data. CLIMATE_FIXTURE=<path> selects an offline
+# fixture file; otherwise the live API behind a TTL cache.
+def get_default_provider():
+    global _default_provider
+    with _default_lock:
+        if _default_provider is None:
+            fixture = os.environ.get('CLIMATE_FIXTURE')
+            source = FixtureProvider(fixture) if fixture else OpenWeatherMapProvider()
+            _default_provider = CachedProvider(source)
+        return _default_provider
+
+
+def set_default_provider(provider):
+    global _default_provider
+    with _default_lock:
+        _default_provider = provider
@@ -0,0 +1,122 @@
+# data_cache.py
+# Columnar cache for daily_dataset.csv.
+# The CSV is parsed once into one .npy file per column (categorical LCLid codes,
+# float32 energy columns and pre-derived calendar features). Later loads memory-map
+# those files instead of re-parsing the CSV and its dates.
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+
+CACHE_ROOT = os.path.join('datasets', '.cache')
+CACHE_VERSION = 1
+MANIFEST_FILENAME = 'manifest.json'
+
+CALENDAR_DTYPES = {'day_of_week': 'int8', 'month': 'int8', 'day_of_month': 'int8', 'year': 'int16'}
+
+
+def cache_dir_for(csv_path, cache_root=CACHE_ROOT):
+    name = os.path.splitext(os.path.basename(csv_path.replace('\\', '/')))[0]
+    return os.path.join(cache_root, name)
+
+
+# Size and modification time identify the version of the source file the cache was built from
+def source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def read_manifest(cache_dir):
+    manifest_path = os.path.join(cache_dir, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_stale(csv_path, cache_dir):
+    manifest = read_manifest(cache_dir)
+    if manifest is None or manifest.get('cache_version') != CACHE_VERSION:
+        return True
+    return manifest.get('source') != source_signature(csv_path)
+
+
+# Parse the CSV once and write each column as its own .npy file
+def build_cache(csv_path, cache_dir):
+    signature = source_signature(csv_path)
+    df = pd.read_csv(csv_path, dtype={'LCLid': 'category'})
+    day = pd.to_datetime(df['day'], format='%d-%m-%Y')
+
+    columns = {
+        'LCLid': df['LCLid'].cat.codes.to_numpy(),
+        'day': day.to_numpy(),
+        'day_of_week': day.dt.dayofweek.to_numpy(dtype=CALENDAR_DTYPES['day_of_week']),
+        'month': day.dt.month.to_numpy(dtype=CALENDAR_DTYPES['month']),
+        'day_of_month': day.dt.day.to_numpy(dtype=CALENDAR_DTYPES['day_of_month']),
+        'year': day.dt.year.to_numpy(dtype=CALENDAR_DTYPES['year'])
+    }
+
+    # Same rows load_dataset keeps after dropna
+    value_columns = [c for c in df.columns if c not in ('LCLid', 'day')]
+    keep = day.notna().to_numpy() & df[value_columns].notna().all(axis=1).to_numpy()
+
+    for name in value_columns:
+        values = df[name].to_numpy()[keep]
+        if np.issubdtype(values.dtype, np.floating):
+            values = values.astype('float32')
+        else:
+            values = pd.to_numeric(values, downcast='integer')
+        columns[name] = values
+    for name in ('LCLid', 'day') + tuple(CALENDAR_DTYPES):
+        columns[name] = columns[name][keep]
+
+    tmp_dir = f'{cache_dir}.tmp-{os.getpid()}'
+    os.makedirs(tmp_dir, exist_ok=True)
+    for name, values in columns.items():
+        np.save(os.path.join(tmp_dir, f'{name}.npy'), values)
+
+    manifest = {
+        'cache_version': CACHE_VERSION,
+        'source': signature,
+        'rows': int(keep.sum()),
+        'columns': list(columns),
+        'lclid_categories': list(df['LCLid'].cat.categories)
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILENAME), 'w') as f:
+        json.dump(manifest, f)
+
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
+    os.replace(tmp_dir, cache_dir)
+    return manifest
+
+
+# Memory-map the cached columns into a DataFrame shaped like load_dataset's output.
+# Arrays are mapped copy-on-write, so callers may still modify the frame.
+def read_cache(cache_dir, manifest):
+    columns = {
+        name: np.load(os.path.join(cache_dir, f'{name}.npy'), mmap_mode='c')
+        for name in manifest['columns']
+    }
+    df = pd.DataFrame(columns, copy=False)
+    df.attrs['LCLid_categories'] = manifest['lclid_categories']
+    return df
+
+
+# Load daily_dataset.csv through the cache, rebuilding it when the CSV has changed
+def load_daily_dataset(csv_path, cache_root=CACHE_ROOT):
+    cache_dir = cache_dir_for(csv_path, cache_root)
+    if is_stale(csv_path, cache_dir):
+        instrumentation.cache_miss('dataset')
+        manifest = build_cache(csv_path, cache_dir)
+    else:
+        instrumentation.cache_hit('dataset')
+        manifest = read_manifest(cache_dir)
+    return read_cache(cache_dir, manifest)
@@ -0,0 +1,161 @@
+# export.py
+# Bulk export of prediction and allocation results.
+# Parquet, gzip-compressed CSV and Arrow IPC streams are written chunk by chunk, so
+# multi-day forecasts never have to be held in memory as one frame; Excel is kept
+# for small single-day results. The format follows the file extension.
+#
+#   python export.py --start 2014-01-01 --end 2014-03-31 --output forecast.parquet
+#   python export.py --start 2014-01-01 --end 2014-01-07 --generated 5000 --output allocation.csv.gz
+import argparse
+import gzip
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import instrumentation
+from backend_analysis import distribute_energy, load_dataset, load_or_train_model
+from forecast import forecast_dates, forecast_frame
+
+FORMATS = {
+    '.parquet': 'parquet',
+    '.csv.gz': 'csv.gz',
+    '.csv': 'csv',
+    '.arrow': 'arrow',
+    '.arrows': 'arrow',
+    '.xlsx': 'xlsx'
+}
+EXCEL_MAX_ROWS = 1048575  # data rows per sheet, below the header
+
+# filedialog filetypes for the GUI save dialogs
+FILETYPES = [
+    ("Excel files", "*.xlsx"),
+    ("Parquet files", "*.parquet"),
+    ("Compressed CSV files", "*.csv.gz"),
+    ("Arrow IPC stream", "*.arrow"),
+    ("CSV files", "*.csv")
+]
+
+
+def format_for_path(path):
+    for extension, fmt in sorted(FORMATS.items(), key=lambda item: -len(item[0])):
+        if path.lower().endswith(extension):
+            return fmt
+    raise ValueError(f'Unsupported export file {path!r}, expected one of {sorted(FORMATS)}')
+
+
+# Replace LCLid category codes with the household ids they stand for
+def with_lclid_strings(df):
+    categories = df.attrs.get('LCLid_categories')
+    if categories is None or not pd.api.types.is_integer_dtype(df['LCLid']):
+        return df
+    decoded = df.copy()
+    decoded['LCLid'] = pd.Categorical.from_codes(df['LCLid'].to_numpy(), categories=categories)
+    return decoded
+
+
+def _write_excel(chunks, path):
+    with pd.ExcelWriter(path) as writer:
+        sheet, row = 0, 0
+        for chunk in chunks:
+            start = 0
+            while start < len(chunk):
+                if row >= EXCEL_MAX_ROWS:
+                    sheet, row = sheet + 1, 0
+                part = chunk.iloc[start:start + EXCEL_MAX_ROWS - row]
+                part.to_excel(writer, sheet_name=f'Sheet{sheet + 1}', startrow=row + 1 if row else 0,
+                              header=row == 0, index=False)
+                row += len(part)
+                start += len(part)
+
+
+# Write an iterable of frames with identical columns to path, one chunk at a time.
+# Returns the number of rows written.
+def write_chunks(chunks, path, fmt=None, lclid_strings=False):
+    fmt = fmt or format_for_path(path)
+    with instrumentation.span('export', format=fmt) as record:
+        record['rows'] = _write_format(chunks, path, fmt, lclid_strings)
+    return record['rows']
+
+
+def _write_format(chunks, path, fmt, lclid_strings):
+    rows = 0
+
+    def prepared():
+        nonlocal rows
+        for chunk in chunks:
+            rows += len(chunk)
+            yield with_lclid_strings(chunk) if lclid_strings else chunk
+
+    if fmt == 'xlsx':
+        _write_excel(prepared(), path)
+        return rows
+
+    if fmt in ('csv', 'csv.gz'):
+        opener = gzip.open(path, 'wt', newline='', compresslevel=6) if fmt == 'csv.gz' else open(path, 'w', newline='')
+        with opener as f:
+            for i, chunk in enumerate(prepared()):
+                chunk.to_csv(f, header=i == 0, index=False)
+        return rows
+
+    writer, sink = None, None
+    try:
+        for chunk in prepared():
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                if fmt == 'parquet':
+                    writer = pq.ParquetWriter(path, table.schema, compression='zstd')
+                else:
+                    sink = pa.OSFile(path, 'wb')
+                    writer = pa.ipc.new_stream(sink, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+        if sink is not None:
+            sink.close()
+    return rows
+
+
+def export_frame(df, path, fmt=None, lclid_strings=False):
+    return write_chunks([df], path, fmt, lclid_strings)
+
+
+# Long-format forecast frames for start..end, chunk_days dates at a time; with
+# generated_energy each date's predictions are also allocated with distribute_energy
+def forecast_chunks(df, model, start_date, end_date, chunk_days=7, generated_energy=None, store=None):
+    dates = pd.date_range(pd.to_datetime(start_date), pd.to_datetime(end_date), freq='D')
+    for offset in range(0, len(dates), chunk_days):
+        tensor, lclids, chunk_dates = forecast_dates(df, dates[offset:offset + chunk_days], model, store)
+        frame = forecast_frame(tensor, lclids, chunk_dates, df.attrs)
+        if generated_energy is not None:
+            allocated = []
+            for column in range(len(chunk_dates)):
+                predicted_demand_df = pd.DataFrame({'LCLid': lclids, 'predicted_energy': tensor[:, column]})
+                allocated.append(distribute_energy(generated_energy, predicted_demand_df)['allocated_energy'].to_numpy())
+            frame['allocated_energy'] = np.concatenate(allocated)
+        yield frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write bulk demand forecasts (and allocations) without the GUI')
+    parser.add_argument('--start', required=True, help='first forecast date, YYYY-MM-DD')
+    parser.add_argument('--end', required=True, help='last forecast date, YYYY-MM-DD')
+    parser.add_argument('--output', required=True, help=f'output file ({", ".join(sorted(FORMATS))})')
+    parser.add_argument('--generated', type=float, default=None, help='also allocate this much generated energy per day')
+    parser.add_argument('--chunk-days', type=int, default=7)
+    parser.add_argument('--lclid-codes', action='store_true', help='write LCLid category codes instead of ids')
+    args = parser.parse_args()
+
+    df = load_dataset()
+    model = load_or_train_model(df)
+    start = time.perf_counter()
+    chunks = forecast_chunks(df, model, args.start, args.end, args.chunk_days, args.generated)
+    rows = write_chunks(chunks, args.output, lclid_strings=not args.lclid_codes)
+    print(f'Wrote {rows} rows to {args.output} in {time.perf_counter() - start:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
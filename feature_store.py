@@ -0,0 +1,275 @@
+# feature_store.py
+# Lag, rolling-window, holiday and ACORN features for the demand model.
+# History features are cached per household together with a short tail of recent
+# readings, so new days are featurized from that tail alone instead of recomputing
+# the whole history. Incremental updates give the same values as a full rebuild.
+import json
+import os
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+from pipeline import TARGET_COLUMN
+
+HOUSEHOLDS_PATH = 'informations_households.csv'
+FEATURE_CACHE_DIR = os.path.join(data_cache.CACHE_ROOT, 'features')
+
+LAGS = [1, 7]
+WINDOWS = [7, 28]
+TAIL_DAYS = max(LAGS + WINDOWS)
+
+HISTORY_FEATURES = [f'lag_{k}' for k in LAGS] + [f'rolling_mean_{w}' for w in WINDOWS]
+STATIC_FEATURES = ['is_holiday', 'acorn_grouped', 'tariff']
+STORE_FEATURES = HISTORY_FEATURES + STATIC_FEATURES
+
+
+# Anonymous Gregorian algorithm
+def easter_sunday(year):
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _first_monday(year, month):
+    first = date(year, month, 1)
+    return first + timedelta(days=(7 - first.weekday()) % 7)
+
+
+def _last_monday(year, month):
+    last = (date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1))
+    return last - timedelta(days=last.weekday())
+
+
+# One-off changes to the England and Wales calendar in the years the data covers
+MOVED_HOLIDAYS = {date(2012, 5, 28): date(2012, 6, 4)}
+EXTRA_HOLIDAYS = [date(2011, 4, 29), date(2012, 6, 5)]
+
+
+# England and Wales bank holidays, with weekend substitution
+def bank_holidays(years):
+    holidays = set()
+    for year in years:
+        new_year = date(year, 1, 1)
+        if new_year.weekday() >= 5:
+            new_year += timedelta(days=7 - new_year.weekday())
+        easter = easter_sunday(year)
+        christmas, boxing = date(year, 12, 25), date(year, 12, 26)
+        if christmas.weekday() == 5:
+            christmas, boxing = date(year, 12, 27), date(year, 12, 28)
+        elif christmas.weekday() == 6:
+            boxing = date(year, 12, 27)
+            christmas = date(year, 12, 26)
+        elif boxing.weekday() == 5:
+            boxing = date(year, 12, 28)
+        holidays.update([
+            new_year,
+            easter - timedelta(days=2),
+            easter + timedelta(days=1),
+            _first_monday(year, 5),
+            _last_monday(year, 5),
+            _last_monday(year, 8),
+            christmas,
+            boxing
+        ])
+    holidays = {MOVED_HOLIDAYS.get(d, d) for d in holidays}
+    holidays.update(d for d in EXTRA_HOLIDAYS if d.year in set(years))
+    return holidays
+
+
+def is_holiday(days):
+    days = pd.DatetimeIndex(days)
+    if not len(days):
+        return np.zeros(0, dtype='int8')
+    holidays = pd.DatetimeIndex(sorted(bank_holidays(range(days.year.min(), days.year.max() + 1))))
+    return days.normalize().isin(holidays).astype('int8')
+
+
+# Lag and trailing rolling-mean features for every row of values (LCLid, day, value).
+# Rolling windows exclude the current day so features only use past readings.
+def compute_history_features(values):
+    values = values.drop_duplicates(['LCLid', 'day'], keep='last').sort_values(['LCLid', 'day'], kind='stable')
+    values = values.reset_index(drop=True)
+    keyed = values.set_index(['LCLid', 'day'])['value']
+
+    out = values[['LCLid', 'day']].copy()
+    for k in LAGS:
+        lagged = pd.MultiIndex.from_arrays([values['LCLid'], values['day'] - pd.Timedelta(days=k)])
+        out[f'lag_{k}'] = keyed.reindex(lagged).to_numpy(dtype='float32')
+    by_household = values.set_index('day').groupby('LCLid', sort=False)['value']
+    for w in WINDOWS:
+        rolled = by_household.rolling(f'{w}D', closed='left').mean()
+        out[f'rolling_mean_{w}'] = rolled.to_numpy(dtype='float32')
+    return out
+
+
+def _values_frame(df):
+    return pd.DataFrame({
+        'LCLid': df['LCLid'].to_numpy(),
+        'day': pd.to_datetime(df['day']).to_numpy(),
+        'value': df[TARGET_COLUMN].to_numpy(dtype='float32')
+    })
+
+
+# Last TAIL_DAYS days of readings per household, enough to featurize any later day
+def _tails(values):
+    last_day = values.groupby('LCLid')['day'].transform('max')
+    return values[values['day'] > last_day - pd.Timedelta(days=TAIL_DAYS)].reset_index(drop=True)
+
+
+class FeatureStore:
+    def __init__(self, cache_dir=FEATURE_CACHE_DIR, households_path=HOUSEHOLDS_PATH):
+        self.cache_dir = cache_dir
+        self.households_path = households_path
+        self.features = None
+        self.tails = None
+        self.categories = None
+        self.last_timing = None
+        self._metadata = None
+        self._history = None
+        self.load()
+
+    def load(self):
+        meta_path = os.path.join(self.cache_dir, 'meta.json')
+        if not os.path.exists(meta_path):
+            return False
+        with open(meta_path) as f:
+            meta = json.load(f)
+        self.categories = meta['lclid_categories']
+        self.features = pd.read_parquet(os.path.join(self.cache_dir, 'features.parquet'))
+        self.tails = pd.read_parquet(os.path.join(self.cache_dir, 'tails.parquet'))
+        self._history = None
+        return True
+
+    def save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.features.to_parquet(os.path.join(self.cache_dir, 'features.parquet'), index=False)
+        self.tails.to_parquet(os.path.join(self.cache_dir, 'tails.parquet'), index=False)
+        with open(os.path.join(self.cache_dir, 'meta.json'), 'w') as f:
+            json.dump({'lclid_categories': self.categories, 'lags': LAGS, 'windows': WINDOWS}, f)
+
+    # Recompute history features for the whole dataset
+    def rebuild(self, df):
+        start = time.perf_counter()
+        values = _values_frame(df)
+        self.features = compute_history_features(values)
+        self.tails = _tails(values)
+        self.categories = df.attrs.get('LCLid_categories')
+        self._history = None
+        self.last_timing = {'mode': 'full', 'rows': len(self.features), 'seconds': time.perf_counter() - start}
+        print(f'Feature store rebuilt for {len(self.features)} rows in {self.last_timing["seconds"]:.3f} s')
+        return self.last_timing
+
+    # Featurize only days after each household's last cached day, using the cached tails
+    def update(self, new_df):
+        if self.features is None:
+            return self.rebuild(new_df)
+        start = time.perf_counter()
+        new_values = _values_frame(new_df)
+        last_day = self.tails.groupby('LCLid')['day'].max()
+        cutoff = new_values['LCLid'].map(last_day)
+        new_values = new_values[cutoff.isna().to_numpy() | (new_values['day'] > cutoff).to_numpy()]
+
+        households = new_values['LCLid'].unique()
+        context = pd.concat([self.tails[self.tails['LCLid'].isin(households)], new_values], ignore_index=True)
+        computed = compute_history_features(context)
+        new_keys = pd.MultiIndex.from_frame(new_values[['LCLid', 'day']])
+        added = computed[pd.MultiIndex.from_frame(computed[['LCLid', 'day']]).isin(new_keys)]
+
+        self.features = pd.concat([self.features, added], ignore_index=True)
+        untouched = self.tails[~self.tails['LCLid'].isin(households)]
+        self.tails = pd.concat([untouched, _tails(context)], ignore_index=True)
+        self._history = None
+        self.last_timing = {'mode': 'incremental', 'rows': len(added), 'seconds': time.perf_counter() - start}
+        print(f'Feature store updated with {len(added)} rows in {self.last_timing["seconds"]:.3f} s')
+        return self.last_timing
+
+    # Bring the store in line with df: rebuild when empty or codes changed, otherwise add new days
+    def sync(self, df):
+        categories = df.attrs.get('LCLid_categories')
+        if self.features is None or (categories is not None and categories != self.categories):
+            timing = self.rebuild(df)
+        else:
+            timing = self.update(df)
+        self.save()
+        return timing
+
+    def _household_metadata(self, lclids):
+        n = len(lclids)
+        if self.categories is None:
+            return np.full(n, -1, dtype='int16'), np.full(n, -1, dtype='int16')
+        if self._metadata is None:
+            households = pd.read_csv(self.households_path, usecols=['LCLid', 'stdorToU', 'Acorn_grouped'])
+            households = households.set_index('LCLid').reindex(self.categories)
+            self._metadata = (
+                households['Acorn_grouped'].astype('category').cat.codes.to_numpy(dtype='int16'),
+                households['stdorToU'].astype('category').cat.codes.to_numpy(dtype='int16')
+            )
+        acorn, tariff = self._metadata
+        codes = np.asarray(lclids, dtype='int64')
+        valid = (codes >= 0) & (codes < len(acorn))
+        safe = np.where(valid, codes, 0)
+        return np.where(valid, acorn[safe], -1), np.where(valid, tariff[safe], -1)
+
+    # Cached history features indexed by (LCLid, day), built once per features version
+    def _history_index(self):
+        if self._history is None:
+            self._history = self.features.set_index(['LCLid', 'day'])[HISTORY_FEATURES]
+        return self._history
+
+    # df joined with its cached history features plus holiday and ACORN features
+    def training_frame(self, df):
+        keys = pd.MultiIndex.from_arrays([df['LCLid'].to_numpy(), pd.to_datetime(df['day']).to_numpy()])
+        history = self._history_index().reindex(keys)
+        frame = df.copy()
+        for column in HISTORY_FEATURES:
+            frame[column] = history[column].to_numpy()
+        frame['is_holiday'] = is_holiday(frame['day'])
+        frame['acorn_grouped'], frame['tariff'] = self._household_metadata(frame['LCLid'].to_numpy())
+        return frame
+
+    # Store features for the (date, household) rows of build_feature_matrix. Days that
+    # were ingested take the cached values training_frame uses; later days are computed
+    # as of each date from the cached tails. NaN where the needed readings are not cached.
+    def prediction_features(self, lclids, dates):
+        dates = pd.DatetimeIndex(pd.to_datetime(dates)).normalize()
+        lclids = np.asarray(lclids)
+        keys = pd.MultiIndex.from_arrays([np.tile(lclids, len(dates)), np.repeat(dates.to_numpy(), len(lclids))])
+        cached = self._history_index().reindex(keys)
+
+        tails = self.tails
+        first_tail_day = tails['day'].min() if len(tails) else None
+        columns = {name: [] for name in HISTORY_FEATURES}
+        for target_date in dates:
+            if first_tail_day is None or target_date <= first_tail_day:
+                # No cached tail reading precedes this date
+                for name in HISTORY_FEATURES:
+                    columns[name].append(np.full(len(lclids), np.nan, dtype='float32'))
+                continue
+            for k in LAGS:
+                on_day = tails[tails['day'] == target_date - pd.Timedelta(days=k)]
+                columns[f'lag_{k}'].append(on_day.set_index('LCLid')['value'].reindex(lclids).to_numpy(dtype='float32'))
+            for w in WINDOWS:
+                window = tails[(tails['day'] >= target_date - pd.Timedelta(days=w)) & (tails['day'] < target_date)]
+                means = window.groupby('LCLid')['value'].mean()
+                columns[f'rolling_mean_{w}'].append(means.reindex(lclids).to_numpy(dtype='float32'))
+
+        from_tails = {name: np.concatenate(parts) if parts else np.empty(0, 'float32') for name, parts in columns.items()}
+        features = pd.DataFrame({name: np.where(cached[name].isna().to_numpy(), from_tails[name],
+                                                cached[name].to_numpy(dtype='float32'))
+                                 for name in HISTORY_FEATURES})
+        features['is_holiday'] = np.repeat(is_holiday(dates), len(lclids))
+        acorn, tariff = self._household_metadata(lclids)
+        features['acorn_grouped'] = np.tile(acorn, len(dates))
+        features['tariff'] = np.tile(tariff, len(dates))
+        return features[STORE_FEATURES]
@@ -0,0 +1,115 @@
+# forecast.py
+# Multi-date demand forecasting on top of predict_demand_batch.
+# Predictions are memoized per (model version, feature store, households, date), so repeated
+# Predict/Distribute clicks and overlapping range queries only run inference
+# for dates that have not been predicted yet.
+import hashlib
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+import model_store
+from backend_analysis import predict_demand_batch
+
+CACHE_MAX_DATES = 1024
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_unversioned_models = weakref.WeakKeyDictionary()
+_store_ids = weakref.WeakKeyDictionary()
+
+
+# Registry key for stored models; a per-object id for models trained outside the store
+def model_version(model):
+    version = model_store.model_version(model)
+    if version is None:
+        version = _unversioned_models.setdefault(model, f'unversioned-{uuid.uuid4().hex}')
+    return version
+
+
+# A FeatureStore's features are replaced on every sync, so the current frame's identity
+# versions the store within the process
+def _store_key(store):
+    if store is None:
+        return None
+    store_id = _store_ids.setdefault(store, uuid.uuid4().hex)
+    return store_id, id(store.features), len(store.features) if store.features is not None else 0
+
+
+def _households_key(lclids):
+    return hashlib.sha1(np.ascontiguousarray(lclids).tobytes()).hexdigest()
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def cache_info():
+    with _cache_lock:
+        return {'dates': len(_cache), 'max_dates': CACHE_MAX_DATES}
+
+
+# Households x dates array of predicted energy, running one batched inference
+# for every date that is not cached yet. Returns (tensor, lclids, dates).
+# Models trained with a FeatureStore need the same store here.
+def forecast_dates(df, dates, model, store=None):
+    dates = pd.DatetimeIndex(pd.to_datetime(dates)).normalize()
+    lclids = df['LCLid'].unique()
+    prefix = (model_version(model), _store_key(store), _households_key(lclids))
+
+    columns = {}
+    with _cache_lock:
+        for date in dates:
+            cached = _cache.get(prefix + (date,))
+            if cached is not None:
+                _cache.move_to_end(prefix + (date,))
+                columns[date] = cached
+
+    missing = pd.DatetimeIndex([d for d in dates.unique() if d not in columns])
+    instrumentation.cache_hit('forecast_dates', len(dates.unique()) - len(missing))
+    instrumentation.cache_miss('forecast_dates', len(missing))
+    if len(missing):
+        predicted = predict_demand_batch(df, missing, model, store)
+        values = predicted['predicted_energy'].to_numpy().reshape(len(missing), len(lclids))
+        with _cache_lock:
+            for date, column in zip(missing, values):
+                column = column.copy()
+                column.flags.writeable = False
+                columns[date] = column
+                _cache[prefix + (date,)] = column
+            while len(_cache) > CACHE_MAX_DATES:
+                _cache.popitem(last=False)
+
+    tensor = np.column_stack([columns[date] for date in dates]) if len(dates) else np.empty((len(lclids), 0))
+    return tensor, lclids, dates
+
+
+# Forecast every day from start_date to end_date inclusive
+def forecast_horizon(df, start_date, end_date, model, store=None):
+    dates = pd.date_range(pd.to_datetime(start_date), pd.to_datetime(end_date), freq='D')
+    return forecast_dates(df, dates, model, store)
+
+
+# Long-format frame (LCLid, day, predicted_energy) of a forecast tensor
+def forecast_frame(tensor, lclids, dates, attrs=None):
+    frame = pd.DataFrame({
+        'LCLid': np.tile(lclids, len(dates)),
+        'day': np.repeat(dates.to_numpy(), len(lclids)),
+        'predicted_energy': tensor.T.reshape(-1)
+    })
+    frame.attrs = dict(attrs or {})
+    return frame
+
+
+# Drop-in, memoized equivalent of calculate_predicted_demand for a single date
+def predicted_demand_for_date(df, selected_date, model, store=None):
+    tensor, lclids, _ = forecast_dates(df, [selected_date], model, store)
+    predicted_demand_df = pd.DataFrame({'LCLid': lclids, 'predicted_energy': tensor[:, 0]})
+    predicted_demand_df.attrs = dict(df.attrs)
+    return predicted_demand_df
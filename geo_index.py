@@ -0,0 +1,114 @@
+# geo_index.py
+# Spatial join of household coordinates to the London MSOA polygons.
+# The point-in-polygon join runs once (and is cached on disk); every map render
+# afterwards is a single groupby over the (household, polygon) pairs. Each household
+# is assigned to exactly one polygon, so the maps and aggregation.py's roll-ups
+# count it in the same place.
+import json
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+import data_cache
+
+# The shapefile ships at the repository root; a copy under datasets/ takes precedence
+SHAPEFILE_PATH = next((path for path in (os.path.join('datasets', 'london_shapefile'), 'london_shapefile')
+                       if os.path.exists(os.path.join(path, 'london.shp'))), 'london_shapefile')
+COORDINATES_PATH = os.path.join('datasets', 'synthetic_locality_coordinates.csv')
+JOIN_CACHE_PATH = os.path.join(data_cache.CACHE_ROOT, 'household_polygons.csv')
+JOIN_VERSION = 2  # bump when the assignment rule changes, to invalidate cached joins
+
+_polygons = None
+_pairs = None
+_pair_codes = {}
+
+
+def load_polygons():
+    global _polygons
+    if _polygons is None:
+        _polygons = gpd.read_file(SHAPEFILE_PATH)
+    return _polygons
+
+
+def _sources_signature():
+    return json.dumps({
+        'join_version': JOIN_VERSION,
+        'shapefile': data_cache.source_signature(os.path.join(SHAPEFILE_PATH, 'london.shp')),
+        'coordinates': data_cache.source_signature(COORDINATES_PATH)
+    }, sort_keys=True)
+
+
+# Point-in-polygon join of every household coordinate, using the polygons' spatial index
+def build_household_polygons(polygons, coordinates):
+    points = gpd.GeoDataFrame(
+        coordinates[['LCLid']],
+        geometry=gpd.points_from_xy(coordinates.longitude, coordinates.latitude),
+        crs='EPSG:4326'
+    )
+    if polygons.crs is not None:
+        points = points.to_crs(polygons.crs)
+
+    areas = gpd.GeoDataFrame({'polygon': np.arange(len(polygons))}, geometry=polygons.geometry.values, crs=polygons.crs)
+    joined = gpd.sjoin(points, areas, how='inner', predicate='within')
+
+    # One polygon per household: the one holding most of its points, the lowest index on ties
+    points_per_pair = joined.groupby(['LCLid', 'polygon']).size().rename('points').reset_index()
+    pairs = (points_per_pair.sort_values(['LCLid', 'points', 'polygon'], ascending=[True, False, True])
+             .drop_duplicates('LCLid')[['LCLid', 'polygon']].reset_index(drop=True))
+    pairs['polygon'] = pairs['polygon'].astype('int32')
+    return pairs
+
+
+# (LCLid, polygon) pairs, one per joined household, computed once per process and
+# cached on disk across runs
+def household_polygons():
+    global _pairs
+    if _pairs is not None:
+        return _pairs
+
+    signature = _sources_signature()
+    signature_path = JOIN_CACHE_PATH + '.signature'
+    if os.path.exists(JOIN_CACHE_PATH) and os.path.exists(signature_path):
+        with open(signature_path) as f:
+            if f.read() == signature:
+                _pairs = pd.read_csv(JOIN_CACHE_PATH, dtype={'LCLid': str, 'polygon': 'int32'})
+                return _pairs
+
+    coordinates = pd.read_csv(COORDINATES_PATH)
+    _pairs = build_household_polygons(load_polygons(), coordinates)
+
+    os.makedirs(os.path.dirname(JOIN_CACHE_PATH), exist_ok=True)
+    _pairs.to_csv(JOIN_CACHE_PATH, index=False)
+    with open(signature_path, 'w') as f:
+        f.write(signature)
+    return _pairs
+
+
+# LCLid category codes of the joined pairs, for frames that carry codes instead of LCLid strings
+def _codes_for(categories):
+    key = tuple(categories)
+    if key not in _pair_codes:
+        pairs = household_polygons()
+        _pair_codes[key] = pd.Categorical(pairs['LCLid'], categories=categories).codes
+    return _pair_codes[key]
+
+
+# Mean of value_column per polygon, NaN for polygons without any household
+def aggregate_by_polygon(values_df, value_column):
+    pairs = household_polygons()
+    values = values_df.groupby('LCLid')[value_column].mean()
+
+    categories = values_df.attrs.get('LCLid_categories')
+    if categories is not None and pd.api.types.is_integer_dtype(values_df['LCLid']):
+        pair_keys = _codes_for(categories)
+    else:
+        pair_keys = pairs['LCLid'].to_numpy()
+
+    pair_values = pd.DataFrame({
+        'polygon': pairs['polygon'].to_numpy(),
+        'value': values.reindex(pair_keys).to_numpy()
+    })
+    per_polygon = pair_values.groupby('polygon')['value'].mean()
+    return per_polygon.reindex(np.arange(len(load_polygons()))).to_numpy()
@@ -0,0 +1,223 @@
+# incremental.py
+# Incremental model updates for newly arrived daily readings.
+# New rows are appended to the dataset CSV and the stored model is updated by either
+#  - "continue": boosting a few more trees on the new rows from the existing booster, or
+#  - "window":   refitting on a sliding window of the most recent days.
+# RMSE/R^2 of the current model on the new rows are tracked against its stored
+# baseline. When drift crosses a threshold, or new households shift the LCLid codes
+# the model was trained on, the model is fully retrained instead. The updated model
+# is stored under the key of the appended dataset, so the next load_or_train_model
+# picks it up.
+#
+#   python incremental.py new_readings.csv --mode continue
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+
+import model_store
+from pipeline import FEATURE_COLUMNS, MODEL_PARAMS, TARGET_COLUMN, fit_model, get_context
+
+UPDATE_ROUNDS = 20
+WINDOW_DAYS = 365
+RMSE_DRIFT_RATIO = 1.25   # retrain when RMSE on new rows exceeds baseline RMSE by 25%
+R2_DRIFT_DROP = 0.10      # retrain when R^2 on new rows falls 0.10 below baseline R^2
+MODES = ('continue', 'window')
+DAY_FORMAT = '%d-%m-%Y'  # day format of daily_dataset.csv
+
+
+# Encode raw readings (LCLid strings, day, energy columns) like the loaded dataset.
+# The categories become the sorted union of known and new LCLids, which is what
+# astype('category') gives when the appended CSV is reloaded; unseen households
+# can therefore shift the codes of existing ones (see recode_lclids).
+def prepare_new_rows(raw, df, day_format=DAY_FORMAT):
+    rows = raw.copy()
+    if not pd.api.types.is_datetime64_any_dtype(rows['day']):
+        rows['day'] = pd.to_datetime(rows['day'], format=day_format)
+    rows['day_of_week'] = rows['day'].dt.dayofweek
+    rows['month'] = rows['day'].dt.month
+    rows['day_of_month'] = rows['day'].dt.day
+    rows['year'] = rows['day'].dt.year
+
+    categories = list(df.attrs.get('LCLid_categories') or [])
+    if not pd.api.types.is_integer_dtype(rows['LCLid']):
+        categories = sorted(set(categories).union(pd.unique(rows['LCLid'].dropna())))
+        rows['LCLid'] = pd.Categorical(rows['LCLid'], categories=categories).codes
+
+    rows = rows[[c for c in df.columns if c in rows.columns]].dropna()
+    rows = rows.astype({c: df[c].dtype for c in rows.columns if c != 'LCLid'})
+    rows['LCLid'] = rows['LCLid'].astype(_codes_dtype(categories))
+    rows.attrs['LCLid_categories'] = categories
+    return rows
+
+
+# Integer dtype pandas uses for the codes of this many categories
+def _codes_dtype(categories):
+    return pd.Categorical([], categories=categories).codes.dtype
+
+
+# True when every existing household keeps its code under the new categories
+def codes_preserved(old_categories, new_categories):
+    old_categories = list(old_categories or [])
+    return list(new_categories[:len(old_categories)]) == old_categories
+
+
+# df with its LCLid codes re-encoded against categories (a sorted superset of its own)
+def recode_lclids(df, categories):
+    old_categories = df.attrs.get('LCLid_categories')
+    if old_categories is None or list(old_categories) == list(categories):
+        return df
+    remap = np.searchsorted(np.asarray(categories, dtype=object), np.asarray(old_categories, dtype=object))
+    codes = df['LCLid'].to_numpy()
+    recoded = df.copy()
+    recoded['LCLid'] = np.where(codes < 0, -1, remap[codes]).astype(_codes_dtype(categories))
+    recoded.attrs = dict(df.attrs)
+    recoded.attrs['LCLid_categories'] = list(categories)
+    return recoded
+
+
+def append_rows(df, new_rows):
+    categories = new_rows.attrs.get('LCLid_categories', df.attrs.get('LCLid_categories'))
+    combined = pd.concat([recode_lclids(df, categories), new_rows], ignore_index=True)
+    combined.attrs = dict(df.attrs)
+    combined.attrs['LCLid_categories'] = categories
+    return combined
+
+
+# raw in the column order and day format of the dataset CSV, ready to be appended
+def dataset_rows(raw, dataset_path, day_format=DAY_FORMAT):
+    header = list(pd.read_csv(dataset_path, nrows=0).columns)
+    missing = [c for c in header if c not in raw.columns]
+    if missing:
+        raise ValueError(f'New readings are missing dataset columns {missing}')
+    rows = raw[header].copy()
+    if pd.api.types.is_datetime64_any_dtype(rows['day']):
+        day = rows['day']
+    else:
+        day = pd.to_datetime(rows['day'], format=day_format)
+    rows['day'] = day.dt.strftime(DAY_FORMAT)
+    return rows
+
+
+def append_to_dataset(rows, dataset_path):
+    rows.to_csv(dataset_path, mode='a', header=False, index=False)
+
+
+def evaluate(model, rows, features=FEATURE_COLUMNS):
+    y = rows[TARGET_COLUMN]
+    y_pred = model.predict(rows[features])
+    return {'rmse': float(np.sqrt(mean_squared_error(y, y_pred))), 'r2': float(r2_score(y, y_pred)) if len(rows) > 1 else float('nan')}
+
+
+def drift_exceeded(baseline, current, rmse_ratio=RMSE_DRIFT_RATIO, r2_drop=R2_DRIFT_DROP):
+    if current['rmse'] > baseline['rmse'] * rmse_ratio:
+        return True
+    return bool(np.isfinite(current['r2']) and current['r2'] < baseline['r2'] - r2_drop)
+
+
+# Add `rounds` trees fitted on 80% of the new rows on top of the existing booster and
+# return the updated model with its metrics on the held-out 20%, like fit_model
+def continue_boosting(model, new_rows, params=MODEL_PARAMS, rounds=UPDATE_ROUNDS, features=FEATURE_COLUMNS):
+    if len(new_rows) < 2:
+        raise ValueError('Continued boosting needs at least two new rows to hold some out')
+    train_rows, test_rows = train_test_split(new_rows, test_size=0.2, random_state=42)
+    updated = xgb.XGBRegressor(**{**params, 'n_estimators': rounds})
+    updated.fit(train_rows[features], train_rows[TARGET_COLUMN], xgb_model=model.get_booster())
+    return updated, evaluate(updated, test_rows, features)
+
+
+def refit_window(df, params=MODEL_PARAMS, window_days=WINDOW_DAYS, features=FEATURE_COLUMNS):
+    recent = df[df['day'] > df['day'].max() - pd.Timedelta(days=window_days)]
+    return fit_model(recent, params, features)
+
+
+# Update the model with new_rows and store the result under the combined dataset's key;
+# the caller appends the rows to the dataset CSV so the key matches on the next load.
+# Returns (model, metadata, combined df).
+def update_model(df, new_rows, model, params=MODEL_PARAMS, mode='continue', rounds=UPDATE_ROUNDS,
+                 window_days=WINDOW_DAYS, rmse_ratio=RMSE_DRIFT_RATIO, r2_drop=R2_DRIFT_DROP):
+    if mode not in MODES:
+        raise ValueError(f'Unknown update mode {mode!r}, expected one of {MODES}')
+
+    previous_key = model_store.model_version(model)
+    previous = model_store.load_metadata(previous_key) if previous_key else None
+    baseline = previous['metrics'] if previous else None
+
+    combined = append_rows(df, new_rows)
+    # The model's LCLid splits refer to the old codes; they cannot be reused once codes shift
+    preserved = codes_preserved(df.attrs.get('LCLid_categories'), combined.attrs['LCLid_categories'])
+    drift = evaluate(model, new_rows) if preserved else {'rmse': None, 'r2': None}
+
+    start = time.perf_counter()
+    if not preserved or baseline is None or drift_exceeded(baseline, drift, rmse_ratio, r2_drop):
+        action = 'full_retrain'
+        model, metrics = fit_model(combined, params)
+    elif mode == 'continue':
+        action = 'continue_boosting'
+        model, metrics = continue_boosting(model, new_rows, params, rounds)
+    else:
+        action = 'window_refit'
+        model, metrics = refit_window(combined, params, window_days)
+    update_seconds = time.perf_counter() - start
+
+    key = model_store.model_key(combined, FEATURE_COLUMNS, TARGET_COLUMN, params)
+    event = {
+        'at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'action': action,
+        'new_rows': len(new_rows),
+        'lclid_codes_changed': not preserved,
+        'new_rows_rmse': drift['rmse'],
+        'new_rows_r2': drift['r2'],
+        'seconds': update_seconds,
+        'parent': previous_key
+    }
+    metadata = {
+        'key': key,
+        'store_version': model_store.STORE_VERSION,
+        'created_at': event['at'],
+        'xgboost_version': xgb.__version__,
+        'features': FEATURE_COLUMNS,
+        'target': TARGET_COLUMN,
+        'params': params,
+        'metrics': metrics,
+        'train_rows': len(combined),
+        'train_seconds': update_seconds,
+        'lclid_categories': combined.attrs.get('LCLid_categories'),
+        'drift_history': (previous or {}).get('drift_history', []) + [event]
+    }
+    model_store.save_model(model, key, metadata)
+    model_store.register_version(model, key)
+    if preserved:
+        print(f'{action} on {len(new_rows)} new rows in {update_seconds:.2f} s '
+              f'(new-row RMSE {drift["rmse"]:.4f}, R-squared {drift["r2"]:.4f})')
+    else:
+        print(f'{action} on {len(new_rows)} new rows in {update_seconds:.2f} s (new households shifted the LCLid codes)')
+    return model, metadata, combined
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Update the stored demand model with new daily readings')
+    parser.add_argument('readings', help='CSV of new rows in the daily_dataset.csv layout')
+    parser.add_argument('--mode', choices=MODES, default='continue')
+    parser.add_argument('--rounds', type=int, default=UPDATE_ROUNDS)
+    parser.add_argument('--window-days', type=int, default=WINDOW_DAYS)
+    parser.add_argument('--day-format', default=DAY_FORMAT, help='format of the day column in the readings')
+    args = parser.parse_args()
+
+    context = get_context()
+    df = context.dataset()
+    model, _ = context.model()
+    raw = pd.read_csv(args.readings)
+    rows = dataset_rows(raw, context.dataset_path, args.day_format)
+    new_rows = prepare_new_rows(raw, df, args.day_format)
+    update_model(df, new_rows, model, mode=args.mode, rounds=args.rounds, window_days=args.window_days)
+    # The model is stored under the key of the dataset with these rows appended
+    append_to_dataset(rows, context.dataset_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+# instrumentation.py
+# Timing spans, row counts, peak memory and cache counters for the pipeline stages.
+# Every finished span is logged as one JSON line on the 'energy.metrics' logger and
+# aggregated per stage; the aggregates and counters render as Prometheus text for
+# service.py's /metrics endpoint or a node-exporter textfile. Uses the standard
+# library only, so importing it never pulls in the heavy dependencies.
+#
+#   ENERGY_METRICS_LOG=outputs/metrics.jsonl      JSON span log
+#   ENERGY_TRACE_MEMORY=1                         peak traced memory of outermost spans (slower)
+#   ENERGY_PROFILE_STAGES=predict,solve           cProfile these stages
+#   ENERGY_PROFILE_DIR=outputs/profiles           where the .prof files go
+import cProfile
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+
+PROFILE_DIR = os.environ.get('ENERGY_PROFILE_DIR', os.path.join('outputs', 'profiles'))
+METRIC_PREFIX = 'energy'
+
+logger = logging.getLogger('energy.metrics')
+
+_lock = threading.Lock()
+_stages = defaultdict(lambda: {'calls': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'rows': 0,
+                               'peak_memory_bytes': 0})
+_counters = defaultdict(int)
+_profile_stages = {s for s in os.environ.get('ENERGY_PROFILE_STAGES', '').split(',') if s}
+
+# tracemalloc keeps one process-wide peak, so only the outermost span resets and reads
+# it, and only when no span ran on another thread meanwhile; other spans record None
+_traced_spans = 0
+_memory_owner = None
+
+
+def configure_json_log(path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    return handler
+
+
+def enable_memory_tracing():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def enable_profiling(stages, profile_dir=None):
+    global PROFILE_DIR
+    _profile_stages.update(stages)
+    if profile_dir:
+        PROFILE_DIR = profile_dir
+
+
+def disable_profiling():
+    _profile_stages.clear()
+
+
+def _start_memory():
+    global _traced_spans, _memory_owner
+    with _lock:
+        _traced_spans += 1
+        if _traced_spans == 1:
+            tracemalloc.reset_peak()
+            _memory_owner = {'thread': threading.get_ident(), 'shared': False}
+            return _memory_owner
+        if _memory_owner is not None and _memory_owner['thread'] != threading.get_ident():
+            _memory_owner['shared'] = True
+        return None
+
+
+def _stop_memory(owner):
+    global _traced_spans, _memory_owner
+    with _lock:
+        _traced_spans -= 1
+        if owner is None:
+            return None
+        _memory_owner = None
+        return None if owner['shared'] else tracemalloc.get_traced_memory()[1]
+
+
+# Time a stage. Yields a dict; set 'rows' on it when the row count is known only at the end.
+# Peak memory is measured only while tracemalloc is tracing, and only for outermost spans
+# that did not overlap spans on other threads (it includes any nested spans).
+@contextmanager
+def span(stage, rows=None, **fields):
+    record = {'rows': rows}
+    profiler = cProfile.Profile() if stage in _profile_stages else None
+    tracing = tracemalloc.is_tracing()
+    memory_owner = _start_memory() if tracing else None
+    if profiler is not None:
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (an enclosing profiled span) is already active on this thread
+            profiler = None
+    start = time.perf_counter()
+    error = None
+    try:
+        yield record
+    except BaseException as exc:
+        error = type(exc).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(PROFILE_DIR, f'{stage}-{time.strftime("%Y%m%d-%H%M%S")}-{threading.get_ident()}.prof'))
+        peak = _stop_memory(memory_owner) if tracing else None
+        _record(stage, seconds, record.get('rows'), peak, error, fields)
+
+
+def _record(stage, seconds, rows, peak, error, fields):
+    with _lock:
+        stats = _stages[stage]
+        stats['calls'] += 1
+        stats['errors'] += error is not None
+        stats['seconds'] += seconds
+        stats['max_seconds'] = max(stats['max_seconds'], seconds)
+        stats['rows'] += rows or 0
+        if peak is not None:
+            stats['peak_memory_bytes'] = max(stats['peak_memory_bytes'], peak)
+    if logger.isEnabledFor(logging.INFO):
+        entry = {'ts': time.time(), 'stage': stage, 'seconds': round(seconds, 6), 'rows': rows,
+                 'peak_memory_bytes': peak, 'error': error, 'thread': threading.current_thread().name}
+        entry.update(fields)
+        logger.info(json.dumps(entry, default=str))
+
+
+# Decorator form of span; rows_from(result) gives the row count of the result
+def instrumented(stage, rows_from=None):
+    def wrap(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage) as record:
+                result = fn(*args, **kwargs)
+                if rows_from is not None:
+                    record['rows'] = rows_from(result)
+                return result
+        return wrapper
+    return wrap
+
+
+def count(name, n=1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] += n
+
+
+def cache_hit(cache, n=1):
+    count('cache_events', n, cache=cache, result='hit')
+
+
+def cache_miss(cache, n=1):
+    count('cache_events', n, cache=cache, result='miss')
+
+
+def snapshot():
+    with _lock:
+        return {
+            'stages': {stage: dict(stats) for stage, stats in _stages.items()},
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in _counters.items()]
+        }
+
+
+def reset():
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    return ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+
+
+# Prometheus text exposition format
+def prometheus_text():
+    with _lock:
+        stages = {stage: dict(stats) for stage, stats in _stages.items()}
+        counters = dict(_counters)
+
+    lines = []
+    stage_metrics = [
+        ('stage_calls_total', 'counter', 'calls', 'Finished spans per stage'),
+        ('stage_errors_total', 'counter', 'errors', 'Spans per stage that raised'),
+        ('stage_seconds_total', 'counter', 'seconds', 'Wall time spent per stage'),
+        ('stage_max_seconds', 'gauge', 'max_seconds', 'Slowest span per stage'),
+        ('stage_rows_total', 'counter', 'rows', 'Rows processed per stage'),
+        ('stage_peak_memory_bytes', 'gauge', 'peak_memory_bytes', 'Highest traced memory peak of outermost non-overlapping spans per stage')
+    ]
+    for metric, kind, field, help_text in stage_metrics:
+        lines.append(f'# HELP {METRIC_PREFIX}_{metric} {help_text}')
+        lines.append(f'# TYPE {METRIC_PREFIX}_{metric} {kind}')
+        for stage, stats in sorted(stages.items()):
+            lines.append(f'{METRIC_PREFIX}_{metric}{{stage="{_escape(stage)}"}} {stats[field]}')
+
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f'# TYPE {METRIC_PREFIX}_{name}_total counter')
+        for (counter_name, labels), value in sorted(counters.items()):
+            if counter_name == name:
+                lines.append(f'{METRIC_PREFIX}_{name}_total{{{_labels(labels)}}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+# Atomically (re)write the metrics file for a textfile collector
+def write_prometheus(path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+    return path
+
+
+if os.environ.get('ENERGY_METRICS_LOG'):
+    configure_json_log(os.environ['ENERGY_METRICS_LOG'])
+if os.environ.get('ENERGY_TRACE_MEMORY'):
+    enable_memory_tracing()
@@ -0,0 +1,93 @@
+# load_test.py
+# Load test for service.py: fires concurrent requests and reports p50/p99 latency and throughput.
+#
+#   python load_test.py --url http://127.0.0.1:8050 --requests 2000 --concurrency 32
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+
+def make_payloads(start_date, days, seed):
+    rng = random.Random(seed)
+    first = date.fromisoformat(start_date)
+    dates = [(first + timedelta(days=i)).isoformat() for i in range(days)]
+    return {
+        'predict': lambda: {'dates': [rng.choice(dates)]},
+        'allocate': lambda: {'date': rng.choice(dates), 'generated_energy': rng.uniform(1000, 20000)},
+        'solar': lambda: {'rooftop_area': rng.uniform(10, 200), 'orientation': rng.choice(['south', 'east', 'west', 'north', 'flat'])},
+        'wind': lambda: {'wind_speed': rng.uniform(2, 15), 'rotor_diameter': rng.uniform(20, 120)}
+    }
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def send(url, endpoint, payload, timeout):
+    request = urllib.request.Request(f'{url}/{endpoint}', data=json.dumps(payload).encode(),
+                                     headers={'Content-Type': 'application/json'}, method='POST')
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+        status = response.status
+    return time.perf_counter() - start, status
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the energy service')
+    parser.add_argument('--url', default='http://127.0.0.1:8050')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--endpoints', default='predict,allocate,solar,wind')
+    parser.add_argument('--start-date', default='2014-01-01')
+    parser.add_argument('--days', type=int, default=14, help='distinct dates requests are drawn from')
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.start_date, args.days, args.seed)
+    endpoints = args.endpoints.split(',')
+    jobs = [(endpoint, payloads[endpoint]()) for endpoint in (endpoints[i % len(endpoints)] for i in range(args.requests))]
+
+    latencies = {endpoint: [] for endpoint in endpoints}
+    errors = {endpoint: 0 for endpoint in endpoints}
+    lock = threading.Lock()
+
+    def run(job):
+        endpoint, payload = job
+        try:
+            elapsed, _ = send(args.url, endpoint, payload, args.timeout)
+        except Exception:
+            with lock:
+                errors[endpoint] += 1
+            return
+        with lock:
+            latencies[endpoint].append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(run, jobs))
+    wall = time.perf_counter() - start
+
+    print(f'{"endpoint":<10} {"ok":>6} {"errors":>6} {"p50 ms":>9} {"p99 ms":>9}')
+    all_latencies = []
+    for endpoint in endpoints:
+        values = sorted(latencies[endpoint])
+        all_latencies.extend(values)
+        print(f'{endpoint:<10} {len(values):>6} {errors[endpoint]:>6} {percentile(values, 50) * 1000:>9.2f} {percentile(values, 99) * 1000:>9.2f}')
+    all_latencies.sort()
+    print(f'{"all":<10} {len(all_latencies):>6} {sum(errors.values()):>6} '
+          f'{percentile(all_latencies, 50) * 1000:>9.2f} {percentile(all_latencies, 99) * 1000:>9.2f}')
+    print(f'Throughput: {len(all_latencies) / wall:.1f} requests/s over {wall:.2f} s with concurrency {args.concurrency}')
+
+
+if __name__ == '__main__':
+    main()
@@ -7,32 +7,43 @@ import pandas as pd
 # Import backend functions
 from backend_analysis import (
     load_dataset as load_analysis_dataset,
-    train_model as train_analysis_model,
-    calculate_predicted_demand,
+    load_or_train_model as load_analysis_model,
     distribute_energy,
-    generate_prediction_map,
-    generate_distribution_map
+    prediction_map_image,
+    distribution_map_image
 )
+from forecast import predicted_demand_for_date
+from task_runner import TaskRunner
+from export import FILETYPES as EXPORT_FILETYPES, export_frame
 from backend import (
-    load_dataset as load_renewable_dataset,
-    train_model as train_renewable_model,
     predict_solar_energy,
     predict_wind_energy,
     recommend_energy_source
 )
 
-# Load datasets and train models
+# Load the dataset and model once (trained only when the data or config changed).
+# backend.py shares the same pipeline context, so there is nothing to load for it separately.
 analysis_df = load_analysis_dataset()
-analysis_model = train_analysis_model(analysis_df)
-
-renewable_df = load_renewable_dataset()
-renewable_model = train_renewable_model(renewable_df)
+analysis_model = load_analysis_model(analysis_df)
 
 # Create main application window
 root = tk.Tk()
 root.title("Energy Management System")
 root.geometry("1400x900")
 
+# Progress indicator for jobs running in the background
+progress_bar = ttk.Progressbar(root, mode="indeterminate")
+progress_bar.pack(side="bottom", fill="x")
+
+def show_progress(busy):
+    if busy:
+        progress_bar.start(10)
+    else:
+        progress_bar.stop()
+
+# Inference, allocation and rendering run off the Tk thread
+runner = TaskRunner(root, on_busy=show_progress)
+
 # Create tabbed interface
 notebook = ttk.Notebook(root)
 notebook.pack(fill="both", expand=True)
@@ -66,28 +77,41 @@ tk.Label(left_frame, text="Select Date:", font=font_large, bg=frame_color, fg=te
 date_picker = DateEntry(left_frame, width=15, font=font_small)
 date_picker.pack(pady=5)
 
-def update_image(image_path, parent_frame, row, col_span):
-    img = Image.open(image_path)
+# A new date makes any pending prediction or distribution stale
+def on_date_selected(event):
+    runner.cancel("predict")
+    runner.cancel("distribute")
+
+date_picker.bind("<<DateEntrySelected>>", on_date_selected)
+
+def update_image(img, parent_frame, row, col_span):
     img = img.resize((650, 480), Image.LANCZOS)
     img = ImageTk.PhotoImage(img)
     label = tk.Label(parent_frame, image=img, bg=frame_color)
     label.image = img
     label.grid(row=row, column=0, columnspan=col_span, pady=10)
 
+def predict_job(selected_date):
+    predicted_demand_df = predicted_demand_for_date(analysis_df, selected_date, analysis_model)
+    prediction_map = prediction_map_image(predicted_demand_df, selected_date)
+    return predicted_demand_df, prediction_map
+
+def show_prediction(result):
+    predicted_demand_df, prediction_map = result
+    update_image(prediction_map, left_frame, row=4, col_span=2)
+    predict_energy_usage.result_df = predicted_demand_df
+
 def predict_energy_usage():
     selected_date = date_picker.get_date()
-    predicted_demand_df = calculate_predicted_demand(analysis_df, selected_date, analysis_model)
-    prediction_map_path = generate_prediction_map(predicted_demand_df)
-    update_image(prediction_map_path, left_frame, row=4, col_span=2)
-    predict_energy_usage.result_df = predicted_demand_df
+    runner.submit("predict", ("predict", selected_date), predict_job, selected_date, on_success=show_prediction)
 
 tk.Button(left_frame, text="Predict Energy Usage", bg=button_color, fg="white", command=predict_energy_usage).pack(pady=10)
 
 def download_prediction():
     if hasattr(predict_energy_usage, "result_df"):
-        file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx")])
+        file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=EXPORT_FILETYPES)
         if file_path:
-            predict_energy_usage.result_df.to_excel(file_path, index=False)
+            export_frame(predict_energy_usage.result_df, file_path)
 
 tk.Button(left_frame, text="Download Prediction", bg=button_color, fg="white", command=download_prediction).pack(pady=10)
 
@@ -99,22 +123,30 @@ tk.Label(right_frame, text="Enter Generated Energy:", font=font_large, bg=frame_
 energy_input = tk.Entry(right_frame, font=font_small)
 energy_input.pack(pady=5)
 
+def distribute_job(selected_date, generated_energy):
+    predicted_demand_df = predicted_demand_for_date(analysis_df, selected_date, analysis_model)
+    allocation_result_df = distribute_energy(generated_energy, predicted_demand_df)
+    distribution_map = distribution_map_image(allocation_result_df, selected_date, generated_energy)
+    return allocation_result_df, distribution_map
+
+def show_distribution(result):
+    allocation_result_df, distribution_map = result
+    update_image(distribution_map, right_frame, row=4, col_span=2)
+    distribute_energy_usage.result_df = allocation_result_df
+
 def distribute_energy_usage():
     generated_energy = float(energy_input.get())
     selected_date = date_picker.get_date()
-    predicted_demand_df = calculate_predicted_demand(analysis_df, selected_date, analysis_model)
-    allocation_result_df = distribute_energy(generated_energy, predicted_demand_df)
-    distribution_map_path = generate_distribution_map(allocation_result_df)
-    update_image(distribution_map_path, right_frame, row=4, col_span=2)
-    distribute_energy_usage.result_df = allocation_result_df
+    runner.submit("distribute", ("distribute", selected_date, generated_energy), distribute_job,
+                  selected_date, generated_energy, on_success=show_distribution)
 
 tk.Button(right_frame, text="Distribute Energy", bg=button_color, fg="white", command=distribute_energy_usage).pack(pady=10)
 
 def download_distribution():
     if hasattr(distribute_energy_usage, "result_df"):
-        file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx")])
+        file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=EXPORT_FILETYPES)
         if file_path:
-            distribute_energy_usage.result_df.to_excel(file_path, index=False)
+            export_frame(distribute_energy_usage.result_df, file_path)
 
 tk.Button(right_frame, text="Download Distribution", bg=button_color, fg="white", command=download_distribution).pack(pady=10)
 
@@ -8,16 +8,18 @@ import pandas as pd
 from tkinter import filedialog
 from backend_analysis import (
     load_dataset,
-    train_model, 
-    calculate_predicted_demand,
+    load_or_train_model,
     distribute_energy,
-    generate_prediction_map,
-    generate_distribution_map
+    prediction_map_image,
+    distribution_map_image
 )
+from forecast import predicted_demand_for_date
+from task_runner import TaskRunner
+from export import FILETYPES as EXPORT_FILETYPES, export_frame
 
 # Load dataset and train model
 df = load_dataset()
-model = train_model(df)
+model = load_or_train_model(df)
 
 # Create the main application window
 root = tk.Tk()
@@ -50,6 +52,19 @@ taskbar_frame.pack(fill='x', side='top')
 title_label = tk.Label(taskbar_frame, text="Energy Predictor and Distributor", font=title_font, bg=taskbar_color, fg=title_color)
 title_label.pack(pady=10)
 
+# Progress indicator for jobs running in the background
+progress_bar = ttk.Progressbar(taskbar_frame, mode='indeterminate')
+progress_bar.pack(fill='x', side='bottom')
+
+def show_progress(busy):
+    if busy:
+        progress_bar.start(10)
+    else:
+        progress_bar.stop()
+
+# Inference, allocation and rendering run off the Tk thread
+runner = TaskRunner(root, on_busy=show_progress)
+
 # Create the prediction and distribution frames
 main_frame = tk.Frame(root, bg=background_color)
 main_frame.pack(fill='both', expand=True, padx=10, pady=10)
@@ -84,9 +99,8 @@ def on_enter(e):
 def on_leave(e):
     e.widget['background'] = button_color
 
-# Function to crop and update prediction map image
-def update_prediction_map(image_path):
-    img = Image.open(image_path)
+# Function to crop and update prediction map image (rendered in memory)
+def update_prediction_map(img):
     
     # Crop the image to remove whitespace (adjust the cropping box as needed)
     left = 50
@@ -113,9 +127,8 @@ def update_prediction_map(image_path):
     download_button.bind("<Enter>", on_enter)
     download_button.bind("<Leave>", on_leave)
 
-# Function to crop and update distribution map image
-def update_distribution_map(image_path):
-    img = Image.open(image_path)
+# Function to crop and update distribution map image (rendered in memory)
+def update_distribution_map(img):
     
     # Crop the image to remove whitespace (adjust the cropping box as needed)
     left = 50
@@ -143,26 +156,34 @@ def update_distribution_map(image_path):
     download_button.bind("<Leave>", on_leave)
 
 # Define functions to integrate with backend
-def predict_energy_usage():
-    selected_date = date_picker.get_date()
-    predicted_demand_df = calculate_predicted_demand(df, selected_date, model)
-    prediction_map_path = generate_prediction_map(predicted_demand_df)
-    update_prediction_map(prediction_map_path)
+def predict_job(selected_date):
+    predicted_demand_df = predicted_demand_for_date(df, selected_date, model)
+    prediction_map = prediction_map_image(predicted_demand_df, selected_date)
+    return predicted_demand_df, prediction_map
+
+def show_prediction(result):
+    predicted_demand_df, prediction_map = result
+    update_prediction_map(prediction_map)
     # Save prediction result to a global variable
     predict_energy_usage.result_df = predicted_demand_df
     total=predicted_demand_df['predicted_energy'].sum()
     tot_energy = tk.Label(left_frame, text="Total Energy Required= "+str(total), font=large_font, bg=frame_color, fg=text_color)
     tot_energy.grid(row=2, column=0, columnspan=3, pady=10, padx=0, sticky='ew')
 
-def distribute_energy_usage():
-    generated_energy = float(energy_input.get())
+def predict_energy_usage():
     selected_date = date_picker.get_date()
-    selected_date = pd.to_datetime(selected_date)
-    # Use the model to predict demand instead of calculating historical demand
-    predicted_demand_df = calculate_predicted_demand(df, selected_date, model)
+    runner.submit('predict', ('predict', selected_date), predict_job, selected_date, on_success=show_prediction)
+
+def distribute_job(selected_date, generated_energy):
+    # Use the model to predict demand (reuses the Predict result for the same date)
+    predicted_demand_df = predicted_demand_for_date(df, selected_date, model)
     allocation_result_df = distribute_energy(generated_energy, predicted_demand_df)
-    distribution_map_path = generate_distribution_map(allocation_result_df)
-    update_distribution_map(distribution_map_path)
+    distribution_map = distribution_map_image(allocation_result_df, selected_date, generated_energy)
+    return predicted_demand_df, allocation_result_df, distribution_map, generated_energy
+
+def show_distribution(result):
+    predicted_demand_df, allocation_result_df, distribution_map, generated_energy = result
+    update_distribution_map(distribution_map)
     # Save distribution result to a global variable
     distribute_energy_usage.result_df = allocation_result_df
     total=predicted_demand_df['predicted_energy'].sum()
@@ -173,23 +194,36 @@ def distribute_energy_usage():
     sufficiency = tk.Label(right_frame, text=suff, font=large_font, bg=frame_color, fg=text_color)
     sufficiency.grid(row=2, column=0, columnspan=3, pady=10, padx=0, sticky='ew')
 
+def distribute_energy_usage():
+    generated_energy = float(energy_input.get())
+    selected_date = date_picker.get_date()
+    selected_date = pd.to_datetime(selected_date)
+    runner.submit('distribute', ('distribute', selected_date, generated_energy), distribute_job,
+                  selected_date, generated_energy, on_success=show_distribution)
+
+# A new date makes any pending prediction or distribution stale
+def on_date_selected(event):
+    runner.cancel('predict')
+    runner.cancel('distribute')
+
 def download_prediction_result():
     if hasattr(predict_energy_usage, 'result_df'):
-        file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx")])
+        file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=EXPORT_FILETYPES)
         if file_path:
-            predict_energy_usage.result_df.to_excel(file_path, index=False)
+            export_frame(predict_energy_usage.result_df, file_path)
 
 def download_distribution_result():
     if hasattr(distribute_energy_usage, 'result_df'):
-        file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx")])
+        file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=EXPORT_FILETYPES)
         if file_path:
-            distribute_energy_usage.result_df.to_excel(file_path, index=False)
+            export_frame(distribute_energy_usage.result_df, file_path)
 
 # Add widgets to the left frame (prediction)
 date_label = tk.Label(left_frame, text="Select Date:", font=large_font, bg=frame_color, fg=text_color)
 date_label.grid(row=0, column=0, pady=10, padx=5, sticky='e')
 date_picker = DateEntry(left_frame, width=15, background=button_color, foreground='white', borderwidth=1, font=small_font, relief='solid')
 date_picker.grid(row=0, column=1, pady=10, padx=5, sticky='w')
+date_picker.bind('<<DateEntrySelected>>', on_date_selected)
 
 predict_button = tk.Button(left_frame, text="Predict", command=predict_energy_usage, font=large_font, bg=button_color, fg='white', relief='flat')
 predict_button.grid(row=1, column=0, pady=20, padx=100, sticky='ew')
@@ -3,13 +3,10 @@ import tkinter as tk
 from tkinter import ttk, font, filedialog
 from tkcalendar import DateEntry
 from backend import (
-    load_dataset, train_model, predict_solar_energy, predict_wind_energy,
+    load_dataset, load_or_train_model, predict_solar_energy, predict_wind_energy,
     recommend_energy_source, get_climate_data
 )
-
-# Load data and model
-df = load_dataset()
-model = train_model(df)
+from task_runner import TaskRunner
 
 # Create main window
 root = tk.Tk()
@@ -24,6 +21,32 @@ button_color = "#004d40"
 
 root.configure(bg=bg_color)
 
+# Progress indicator for jobs running in the background
+progress_bar = ttk.Progressbar(root, mode="indeterminate")
+progress_bar.pack(side="bottom", fill="x")
+
+def show_progress(busy):
+    if busy:
+        progress_bar.start(10)
+    else:
+        progress_bar.stop()
+
+runner = TaskRunner(root, on_busy=show_progress)
+
+# Load data and model in the background so the window opens immediately
+df = None
+model = None
+
+def load_model_job():
+    loaded_df = load_dataset()
+    return loaded_df, load_or_train_model(loaded_df)
+
+def on_model_loaded(result):
+    global df, model
+    df, model = result
+
+runner.submit("startup", "load_model", load_model_job, on_success=on_model_loaded)
+
 # Left frame for solar energy
 left_frame = tk.Frame(root, bg=frame_color)
 left_frame.pack(side="left", fill="both", expand=True, padx=20, pady=20)
@@ -0,0 +1,117 @@
+# map_render.py
+# Cached rendering of the London heatmaps.
+# The polygon geometry is turned into one PatchCollection once per process; each new
+# map only updates the collection's face colours, colour limits and title before
+# redrawing the Agg canvas. Maps come back as in-memory PIL images, so the GUIs can
+# hand them to Tk without writing and re-reading a PNG, and recently rendered maps
+# are kept in an LRU cache keyed by (date, mode, generated energy, values digest).
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PatchCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import PathPatch
+from matplotlib.path import Path
+from PIL import Image
+
+import geo_index
+import instrumentation
+
+FIGSIZE = (10, 10)
+CMAP = 'Reds'
+MISSING_COLOR = 'lightgrey'
+CACHE_MAX_MAPS = 64
+
+_renderer = None
+_renderer_lock = threading.Lock()
+_image_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _ring_path(polygon):
+    rings = [polygon.exterior] + list(polygon.interiors)
+    return Path.make_compound_path(*(Path(np.asarray(ring.coords)[:, :2], closed=True) for ring in rings))
+
+
+# One compound path per shapefile row, so collection index i is polygon i
+def geometry_patch(geometry):
+    parts = geometry.geoms if geometry.geom_type == 'MultiPolygon' else [geometry]
+    return PathPatch(Path.make_compound_path(*(_ring_path(p) for p in parts)))
+
+
+class MapRenderer:
+    def __init__(self, polygons, figsize=FIGSIZE, cmap=CMAP):
+        self.figure = Figure(figsize=figsize)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot(1, 1, 1)
+
+        cmap = colormaps[cmap].copy()
+        cmap.set_bad(MISSING_COLOR)
+        self.collection = PatchCollection([geometry_patch(g) for g in polygons.geometry], cmap=cmap,
+                                          edgecolor='face', linewidth=0.2)
+        self.collection.set_array(np.ma.masked_all(len(polygons)))
+        self.ax.add_collection(self.collection)
+
+        minx, miny, maxx, maxy = polygons.total_bounds
+        self.ax.set_xlim(minx, maxx)
+        self.ax.set_ylim(miny, maxy)
+        self.ax.set_aspect('equal')
+        self.colorbar = self.figure.colorbar(self.collection, ax=self.ax, fraction=0.046, pad=0.04)
+        self._lock = threading.Lock()
+
+    # Recolour the polygons with values (NaN = no households) and return an RGB image
+    def render(self, values, title):
+        values = np.ma.masked_invalid(np.asarray(values, dtype='float64'))
+        with self._lock:
+            self.collection.set_array(values)
+            if values.count():
+                self.collection.set_clim(values.min(), values.max())
+            self.colorbar.update_normal(self.collection)
+            self.ax.set_title(title)
+            self.canvas.draw()
+            rgba = np.asarray(self.canvas.buffer_rgba())
+            return Image.fromarray(rgba[..., :3].copy())
+
+
+def get_renderer():
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = MapRenderer(geo_index.load_polygons())
+        return _renderer
+
+
+# Per-polygon means of values_df[column_name], rendered in memory
+def render_values(values_df, column_name, title):
+    with instrumentation.span('render', rows=len(values_df)):
+        return get_renderer().render(geo_index.aggregate_by_polygon(values_df, column_name), title)
+
+
+# The cached image for key, rendered with make_image() on a miss
+def cached_image(key, make_image):
+    with _cache_lock:
+        image = _image_cache.get(key)
+        if image is not None:
+            _image_cache.move_to_end(key)
+            instrumentation.cache_hit('map_image')
+            return image
+    instrumentation.cache_miss('map_image')
+    image = make_image()
+    with _cache_lock:
+        _image_cache[key] = image
+        while len(_image_cache) > CACHE_MAX_MAPS:
+            _image_cache.popitem(last=False)
+    return image
+
+
+def clear_cache():
+    with _cache_lock:
+        _image_cache.clear()
+
+
+def cache_info():
+    with _cache_lock:
+        return {'maps': len(_image_cache), 'max_maps': CACHE_MAX_MAPS}
@@ -0,0 +1,149 @@
+# model_store.py
+# Versioned on-disk registry of trained XGBoost models.
+# Models are keyed by a hash of the training data plus the training configuration,
+# so an unchanged dataset and config load from disk instead of retraining.
+import hashlib
+import json
+import os
+import shutil
+import time
+import weakref
+
+import pandas as pd
+import xgboost as xgb
+
+import instrumentation
+
+MODEL_STORE_DIR = 'models'
+STORE_VERSION = 1
+
+MODEL_FILENAME = 'model.json'
+METADATA_FILENAME = 'metadata.json'
+
+# Registry key of every model handed out by load_or_train, for caches keyed by model version
+_model_versions = weakref.WeakKeyDictionary()
+
+
+# Hash the rows the model is trained on together with the LCLid category mapping
+def dataset_fingerprint(df, columns):
+    hasher = hashlib.sha256()
+    row_hashes = pd.util.hash_pandas_object(df[columns], index=False)
+    hasher.update(row_hashes.to_numpy().tobytes())
+    categories = df.attrs.get('LCLid_categories')
+    if categories is not None:
+        hasher.update(json.dumps(list(categories)).encode())
+    return hasher.hexdigest()
+
+
+def model_key(df, features, target, params):
+    config = {
+        'store_version': STORE_VERSION,
+        'dataset': dataset_fingerprint(df, features + [target]),
+        'features': features,
+        'target': target,
+        'params': params
+    }
+    payload = json.dumps(config, sort_keys=True, default=str).encode()
+    return hashlib.sha256(payload).hexdigest()[:20]
+
+
+def model_version(model):
+    return _model_versions.get(model)
+
+
+def save_model(model, key, metadata, store_dir=MODEL_STORE_DIR):
+    target_dir = os.path.join(store_dir, key)
+    tmp_dir = f'{target_dir}.tmp-{os.getpid()}'
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    model.save_model(os.path.join(tmp_dir, MODEL_FILENAME))
+    with open(os.path.join(tmp_dir, METADATA_FILENAME), 'w') as f:
+        json.dump(metadata, f, indent=2, default=str)
+
+    # Swap the finished artifact into place so readers never see a half-written model
+    if os.path.isdir(target_dir):
+        shutil.rmtree(target_dir)
+    os.replace(tmp_dir, target_dir)
+    return target_dir
+
+
+# Return (model, metadata) for a stored key, or None if it is missing or unreadable
+def load_model(key, store_dir=MODEL_STORE_DIR):
+    target_dir = os.path.join(store_dir, key)
+    model_path = os.path.join(target_dir, MODEL_FILENAME)
+    metadata_path = os.path.join(target_dir, METADATA_FILENAME)
+    if not (os.path.exists(model_path) and os.path.exists(metadata_path)):
+        return None
+
+    try:
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+        if metadata.get('store_version') != STORE_VERSION:
+            return None
+        model = xgb.XGBRegressor()
+        model.load_model(model_path)
+    except (OSError, ValueError, xgb.core.XGBoostError):
+        return None
+
+    _model_versions[model] = key
+    return model, metadata
+
+
+def load_metadata(key, store_dir=MODEL_STORE_DIR):
+    metadata_path = os.path.join(store_dir, key, METADATA_FILENAME)
+    if not os.path.exists(metadata_path):
+        return None
+    with open(metadata_path) as f:
+        return json.load(f)
+
+
+def register_version(model, key):
+    _model_versions[model] = key
+
+
+def list_models(store_dir=MODEL_STORE_DIR):
+    entries = []
+    if not os.path.isdir(store_dir):
+        return entries
+    for key in sorted(os.listdir(store_dir)):
+        metadata_path = os.path.join(store_dir, key, METADATA_FILENAME)
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                entries.append(json.load(f))
+    return entries
+
+
+# Load the model for this dataset and config if it is stored, otherwise train and store it.
+# fit_fn(df, params) must return (model, metrics).
+def load_or_train(df, fit_fn, features, target, params, store_dir=MODEL_STORE_DIR):
+    key = model_key(df, features, target, params)
+
+    stored = load_model(key, store_dir)
+    if stored is not None:
+        model, metadata = stored
+        instrumentation.cache_hit('model_store')
+        print(f'Loaded stored model {key}')
+        return model, metadata
+
+    instrumentation.cache_miss('model_store')
+    start = time.perf_counter()
+    model, metrics = fit_fn(df, params)
+    train_seconds = time.perf_counter() - start
+
+    categories = df.attrs.get('LCLid_categories')
+    metadata = {
+        'key': key,
+        'store_version': STORE_VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'xgboost_version': xgb.__version__,
+        'features': features,
+        'target': target,
+        'params': params,
+        'metrics': metrics,
+        'train_rows': len(df),
+        'train_seconds': train_seconds,
+        'lclid_categories': list(categories) if categories is not None else None
+    }
+    save_model(model, key, metadata, store_dir)
+    _model_versions[model] = key
+    return model, metadata
@@ -0,0 +1,128 @@
+# pipeline.py
+# Shared data and model pipeline for backend.py, backend_analysis.py and the GUIs.
+# The dataset is loaded (and its features derived) once per process, and models are
+# trained or loaded once per configuration, however many modules ask for them.
+# pandas, XGBoost, scikit-learn and the caches are imported on first use, so
+# importing the constants below stays cheap.
+import functools
+import json
+import os
+import threading
+
+import instrumentation
+
+DATASET_PATH = os.path.join('datasets', 'daily_dataset.csv')
+
+# Features the demand model is trained on, in column order
+FEATURE_COLUMNS = ['LCLid', 'day_of_week', 'month', 'day_of_month', 'year']
+TARGET_COLUMN = 'energy_median'
+
+# Hyperparameters of the demand model
+MODEL_PARAMS = {'objective': 'reg:squarederror', 'n_estimators': 150, 'learning_rate': 0.2}
+
+
+# Parse the CSV directly, without the columnar cache
+def read_dataset_csv(path=DATASET_PATH):
+    import pandas as pd
+
+    # Load your dataset
+    df = pd.read_csv(path)
+
+    # Convert 'day' column to datetime
+    df['day'] = pd.to_datetime(df['day'], format='%d-%m-%Y')
+
+    # Extract features
+    df['day_of_week'] = df['day'].dt.dayofweek
+    df['month'] = df['day'].dt.month
+    df['day_of_month'] = df['day'].dt.day
+    df['year'] = df['day'].dt.year
+
+    # Convert LCLid to categorical codes, keeping the code -> LCLid mapping
+    lclid_category = df['LCLid'].astype('category')
+    df['LCLid'] = lclid_category.cat.codes
+    df.attrs['LCLid_categories'] = list(lclid_category.cat.categories)
+
+    df.dropna(inplace=True)
+
+    return df
+
+
+# Train on an 80/20 split and return the model with its test metrics
+def fit_model(df, params=MODEL_PARAMS, features=FEATURE_COLUMNS):
+    import numpy as np
+    import xgboost as xgb
+    from sklearn.metrics import mean_squared_error, r2_score
+    from sklearn.model_selection import train_test_split
+
+    # Define features and target
+    X = df[features]
+    y = df[TARGET_COLUMN]
+
+    # Split the dataset into training and testing sets
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    # Initialize and train XGBoost model
+    with instrumentation.span('train', rows=len(X_train)):
+        xgb_model = xgb.XGBRegressor(**params)
+        xgb_model.fit(X_train, y_train)
+
+    # Make predictions
+    y_pred_xgb = xgb_model.predict(X_test)
+
+    # Evaluate the model
+    mse = mean_squared_error(y_test, y_pred_xgb)
+    rmse = float(np.sqrt(mse))
+    r2 = float(r2_score(y_test, y_pred_xgb))
+
+    return xgb_model, {'rmse': rmse, 'r2': r2}
+
+
+class EnergyContext:
+    def __init__(self, dataset_path=DATASET_PATH, use_cache=True):
+        self.dataset_path = dataset_path
+        self.use_cache = use_cache
+        self._df = None
+        self._models = {}
+        self._lock = threading.RLock()
+
+    # The dataset with calendar features, loaded on first use
+    def dataset(self):
+        import data_cache
+
+        with self._lock:
+            if self._df is None:
+                if self.use_cache:
+                    self._df = data_cache.load_daily_dataset(self.dataset_path)
+                else:
+                    self._df = read_dataset_csv(self.dataset_path)
+            return self._df
+
+    # (model, metadata) for a training configuration, trained or loaded at most once.
+    # Pass df to train on a different frame than the shared dataset.
+    def model(self, params=MODEL_PARAMS, df=None, features=FEATURE_COLUMNS):
+        import model_store
+
+        fit_fn = functools.partial(fit_model, features=features)
+        with self._lock:
+            if df is None:
+                df = self.dataset()
+            if df is not self._df:
+                return model_store.load_or_train(df, fit_fn, features, TARGET_COLUMN, params)
+
+            config = json.dumps({'features': features, 'target': TARGET_COLUMN, 'params': params}, sort_keys=True)
+            if config not in self._models:
+                self._models[config] = model_store.load_or_train(df, fit_fn, features, TARGET_COLUMN, params)
+            return self._models[config]
+
+
+_context = None
+_context_lock = threading.Lock()
+
+
+# Process-wide context shared by both backend modules
+def get_context():
+    global _context
+    with _context_lock:
+        if _context is None:
+            _context = EnergyContext()
+        return _context
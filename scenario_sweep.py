@@ -0,0 +1,116 @@
+# scenario_sweep.py
+# Allocation outcomes for many generated-energy levels across many dates at once.
+# Under the proportional rule every household's allocation is supply * its demand
+# share, so a whole sweep is one broadcast of a supplies vector against the
+# dates x households share matrix. Sufficiency follows evaluate_allocation: a
+# household is sufficient when its allocation covers its predicted demand.
+# (Caps, priorities and feeder limits need the LP engine per scenario and are not swept.)
+#
+#   python scenario_sweep.py --start 2014-01-06 --end 2014-01-12 --min 1000 --max 10000 --levels 500
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend_analysis import load_dataset, load_or_train_model
+from forecast import forecast_dates
+
+
+# Per-household demand shares of each date's total (households x dates)
+def demand_shares(demand):
+    totals = demand.sum(axis=0)
+    return np.divide(demand, totals, out=np.zeros_like(demand), where=totals > 0), totals
+
+
+# Allocations and sufficiency for every (supply, household) pair of every date, plus the
+# total shortfall per (date, supply). demand is households x dates; allocations and
+# sufficient are shaped dates x supplies x households, with allocations stored in
+# float32 to keep large sweeps compact. Sufficiency and shortfall are both computed
+# from the float64 allocations, so a household is sufficient exactly when it adds
+# nothing to the shortfall.
+def sweep_allocations(demand, supplies):
+    demand = np.asarray(demand, dtype='float64')
+    supplies = np.asarray(supplies, dtype='float64')
+    shares, _ = demand_shares(demand)
+    n_households, n_dates = demand.shape
+    allocations = np.empty((n_dates, len(supplies), n_households), dtype='float32')
+    sufficient = np.empty((n_dates, len(supplies), n_households), dtype=bool)
+    shortfall = np.empty((n_dates, len(supplies)), dtype='float64')
+    # One supplies x households broadcast per date, compared in float64 like evaluate_allocation
+    for d in range(n_dates):
+        allocated = np.multiply.outer(supplies, shares[:, d])
+        sufficient[d] = allocated >= demand[:, d]
+        shortfall[d] = np.clip(demand[:, d] - allocated, 0, None).sum(axis=1)
+        allocations[d] = allocated
+    return allocations, sufficient, shortfall
+
+
+# Summary curves per (date, supply): share of households sufficient, total shortfall
+# and supply as a fraction of total demand
+def summary_curves(demand, supplies, dates, sufficient=None, shortfall=None):
+    demand = np.asarray(demand, dtype='float64')
+    supplies = np.asarray(supplies, dtype='float64')
+    if sufficient is None or shortfall is None:
+        _, sufficient, shortfall = sweep_allocations(demand, supplies)
+    totals = demand.sum(axis=0)
+
+    return pd.DataFrame({
+        'day': np.repeat(pd.DatetimeIndex(dates).to_numpy(), len(supplies)),
+        'generated_energy': np.tile(supplies, len(totals)),
+        'predicted_demand': np.repeat(totals, len(supplies)),
+        'coverage': (supplies[None, :] / np.where(totals > 0, totals, np.nan)[:, None]).reshape(-1),
+        'households_sufficient': sufficient.mean(axis=2).reshape(-1),
+        'all_sufficient': sufficient.all(axis=2).reshape(-1),
+        'shortfall': shortfall.reshape(-1)
+    })
+
+
+# Forecast the dates once, then evaluate every supply level against every date.
+# Returns a dict with the per-household arrays and the summary curves.
+def sweep(df, model, supplies, dates, store=None):
+    start = time.perf_counter()
+    demand, lclids, dates = forecast_dates(df, dates, model, store)
+    allocations, sufficient, shortfall = sweep_allocations(demand, supplies)
+    curves = summary_curves(demand, supplies, dates, sufficient, shortfall)
+    return {
+        'supplies': np.asarray(supplies, dtype='float64'),
+        'dates': dates,
+        'lclids': lclids,
+        'allocations': allocations,
+        'sufficient': sufficient,
+        'curves': curves,
+        'seconds': time.perf_counter() - start
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep generated-energy levels over a range of dates')
+    parser.add_argument('--start', required=True, help='first date, YYYY-MM-DD')
+    parser.add_argument('--end', required=True, help='last date, YYYY-MM-DD')
+    parser.add_argument('--min', type=float, required=True, help='lowest generated energy')
+    parser.add_argument('--max', type=float, required=True, help='highest generated energy')
+    parser.add_argument('--levels', type=int, default=500)
+    parser.add_argument('--output', default=None, help='CSV file for the summary curves')
+    args = parser.parse_args()
+
+    df = load_dataset()
+    model = load_or_train_model(df)
+    supplies = np.linspace(args.min, args.max, args.levels)
+    dates = pd.date_range(args.start, args.end, freq='D')
+    result = sweep(df, model, supplies, dates)
+
+    curves = result['curves']
+    print(f'{len(supplies)} supply levels x {len(dates)} dates x {len(result["lclids"])} households '
+          f'in {result["seconds"]:.2f} s')
+    for day, per_day in curves.groupby('day'):
+        enough = per_day.loc[per_day['all_sufficient'], 'generated_energy']
+        needed = f'{enough.min():.1f}' if len(enough) else f'> {args.max:g}'
+        print(f'  {pd.Timestamp(day).date()}: demand {per_day["predicted_demand"].iloc[0]:.1f}, '
+              f'all households sufficient from {needed}')
+    if args.output:
+        curves.to_csv(args.output, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+# service.py
+# Long-running local JSON service for prediction, allocation and renewable estimates.
+# The dataset and model are loaded once at startup; concurrent /predict and /allocate
+# requests are batched into a single inference over the union of their dates.
+#
+#   python service.py --port 8050
+#
+# Endpoints (JSON bodies, JSON responses):
+#   GET  /health
+#   GET  /metrics    Prometheus text: per-stage timings, rows, peak memory, cache hits/misses
+#   POST /predict    {"dates": ["2013-06-15", ...], "households": false}
+#   POST /allocate   {"date": "2013-06-15", "generated_energy": 5000, "caps": [...], ...}
+#   POST /solar      {"rooftop_area": 40, "orientation": "south", "climate_data": {...}}
+#   POST /wind       {"wind_speed": 6.5, "rotor_diameter": 100}
+#   POST /recommend  {"solar_energy": 120.0, "wind_energy": 80.0}
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+import allocation as allocation_engine
+import backend
+import backend_analysis
+import forecast
+import instrumentation
+
+BATCH_WINDOW_SECONDS = 0.005
+MAX_BATCH_REQUESTS = 256
+LISTEN_BACKLOG = 128
+
+
+# Collects prediction requests arriving within a short window and answers all of
+# them from one forecast over the union of their dates
+class PredictionBatcher:
+    def __init__(self, df, model, window=BATCH_WINDOW_SECONDS, max_requests=MAX_BATCH_REQUESTS):
+        self.df = df
+        self.model = model
+        self.window = window
+        self.max_requests = max_requests
+        self.batches = 0
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='prediction-batcher', daemon=True)
+        self._thread.start()
+
+    # Households x len(dates) predictions for the given dates
+    def predict(self, dates):
+        future = Future()
+        self._requests.put((pd.DatetimeIndex(pd.to_datetime(dates)).normalize(), future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._requests.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_requests:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._answer(batch)
+
+    def _answer(self, batch):
+        union = pd.DatetimeIndex(sorted({d for dates, _ in batch for d in dates}))
+        try:
+            tensor, _, _ = forecast.forecast_dates(self.df, union, self.model)
+        except Exception as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        self.batches += 1
+        positions = {date: i for i, date in enumerate(union)}
+        for dates, future in batch:
+            future.set_result(tensor[:, [positions[d] for d in dates]])
+
+
+class EnergyService:
+    def __init__(self):
+        self.df = backend_analysis.load_dataset()
+        self.model = backend_analysis.load_or_train_model(self.df)
+        self.lclids = self.df['LCLid'].unique()
+        categories = self.df.attrs.get('LCLid_categories')
+        self.lclid_names = np.asarray(categories)[self.lclids] if categories is not None else self.lclids
+        self.batcher = PredictionBatcher(self.df, self.model)
+        self.started_at = time.time()
+
+    def health(self, _body):
+        return {'status': 'ok', 'households': int(len(self.lclids)), 'uptime_seconds': time.time() - self.started_at,
+                'prediction_batches': self.batcher.batches, 'forecast_cache': forecast.cache_info()}
+
+    def predict(self, body):
+        dates = body.get('dates') or [body['date']]
+        tensor = self.batcher.predict(dates)
+        results = []
+        for i, date in enumerate(pd.to_datetime(dates)):
+            entry = {'date': date.strftime('%Y-%m-%d'), 'total_predicted_energy': float(tensor[:, i].sum())}
+            if body.get('households'):
+                entry['predictions'] = [
+                    {'LCLid': str(name), 'predicted_energy': float(value)}
+                    for name, value in zip(self.lclid_names, tensor[:, i])
+                ]
+            results.append(entry)
+        return {'results': results}
+
+    def allocate(self, body):
+        demand = self.batcher.predict([body['date']])[:, 0]
+        generated = float(body['generated_energy'])
+        constraints = {k: body[k] for k in ('caps', 'priorities', 'feeders', 'feeder_limits', 'floors') if k in body}
+        allocation, info = allocation_engine.allocate(demand, generated, method=body.get('method', 'auto'), **constraints)
+        response = {
+            'date': body['date'],
+            'generated_energy': generated,
+            'total_predicted_energy': float(demand.sum()),
+            'sufficient': bool(allocation_engine.covers(generated, demand.sum())),
+            'insufficient_households': int((~allocation_engine.covers(allocation, demand)).sum()),
+            'method': info['method'],
+            'solve_seconds': info['solve_seconds']
+        }
+        if body.get('households'):
+            response['allocations'] = [
+                {'LCLid': str(name), 'allocated_energy': float(value)}
+                for name, value in zip(self.lclid_names, allocation)
+            ]
+        return response
+
+    def solar(self, body):
+        energy = backend.predict_solar_energy(float(body['rooftop_area']), body.get('orientation', 'south'), body.get('climate_data', {}))
+        return {'solar_energy': energy}
+
+    def wind(self, body):
+        return {'wind_energy': backend.predict_wind_energy(float(body['wind_speed']), float(body['rotor_diameter']))}
+
+    def recommend(self, body):
+        if 'solar_energy' in body:
+            solar_energy, wind_energy = float(body['solar_energy']), float(body['wind_energy'])
+        else:
+            solar_energy = self.solar(body)['solar_energy']
+            wind_energy = self.wind(body)['wind_energy']
+        return {'solar_energy': solar_energy, 'wind_energy': wind_energy,
+                'recommendation': backend.recommend_energy_source(solar_energy, wind_energy)}
+
+
+def make_handler(service):
+    routes = {
+        ('GET', '/health'): service.health,
+        ('POST', '/predict'): service.predict,
+        ('POST', '/allocate'): service.allocate,
+        ('POST', '/solar'): service.solar,
+        ('POST', '/wind'): service.wind,
+        ('POST', '/recommend'): service.recommend
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _handle(self, method):
+            route = routes.get((method, self.path.split('?')[0]))
+            if route is None:
+                return self._send(404, {'error': f'No route for {method} {self.path}'})
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                return self._send(200, route(body))
+            except (KeyError, ValueError, TypeError) as exc:
+                return self._send(400, {'error': str(exc)})
+            except Exception as exc:
+                return self._send(500, {'error': str(exc)})
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.split('?')[0] == '/metrics':
+                data = instrumentation.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+            self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+# The default listen backlog of 5 overflows under a few dozen concurrent clients, and the
+# SYN retransmits that follow show up as second-long latencies in the load test
+class EnergyHTTPServer(ThreadingHTTPServer):
+    request_queue_size = LISTEN_BACKLOG
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve energy prediction and allocation over HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8050)
+    args = parser.parse_args()
+
+    service = EnergyService()
+    server = EnergyHTTPServer((args.host, args.port), make_handler(service))
+    print(f'Serving on http://{args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
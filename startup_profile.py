@@ -0,0 +1,150 @@
+# startup_profile.py
+# Cold-start cost of the backend modules. Every module is imported in fresh
+# interpreters, which report its wall time, peak traced memory, RSS growth and the
+# heavy dependencies it pulled in, plus the slowest imports from -X importtime.
+#
+#   python startup_profile.py
+#   python startup_profile.py --check    # exit 1 if the renewable path exceeds its budget
+#
+# --check keeps the renewable-estimate path (backend's solar/wind/recommend functions)
+# under RENEWABLE_BUDGET_SECONDS and free of HEAVY_MODULES; run it in CI.
+import argparse
+import json
+import subprocess
+import sys
+
+MODULES = ['pipeline', 'backend', 'backend_analysis', 'forecast', 'climate', 'map_render', 'service']
+HEAVY_MODULES = ['pandas', 'xgboost', 'sklearn', 'scipy', 'pulp', 'geopandas', 'matplotlib', 'requests', 'cryptography']
+
+RENEWABLE_IMPORT = 'from backend import predict_solar_energy, predict_wind_energy, recommend_energy_source'
+RENEWABLE_BUDGET_SECONDS = 0.5
+
+# Child interpreters. The import is timed in a plain interpreter: tracemalloc and
+# -X importtime both slow imports down several times, so memory and the per-module
+# import times come from separate runs of the same statement.
+TIME_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+heavy = sorted(m for m in {heavy!r} if m in sys.modules)
+print(json.dumps({{'seconds': seconds, 'heavy': heavy}}))
+"""
+
+# resource is POSIX-only; on Windows the peak working set comes from psutil if installed
+MEMORY_PROBE = """
+import json, sys, tracemalloc
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / 2 ** 20
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10)
+rss_before = peak_rss_mb()
+tracemalloc.start()
+{statement}
+peak = tracemalloc.get_traced_memory()[1]
+rss_after = peak_rss_mb()
+print(json.dumps({{'peak_mb': peak / 2 ** 20,
+                  'rss_mb': None if rss_before is None else rss_after - rss_before}}))
+"""
+
+
+# Slowest cumulative imports reported by -X importtime on stderr
+def _slowest_imports(stderr, top):
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len('import time:'):].split('|')]
+        rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def _run(args):
+    completed = subprocess.run([sys.executable, *args], capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    return completed
+
+
+def _probe(template, statement):
+    completed = _run(['-c', template.format(statement=statement, heavy=HEAVY_MODULES)])
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+# Cold import time (best of repeat fresh interpreters) and the heavy modules it loaded
+def time_statement(statement, repeat=1):
+    runs = [_probe(TIME_PROBE, statement) for _ in range(repeat)]
+    return min(runs, key=lambda run: run['seconds'])
+
+
+def profile_statement(statement, top=5, repeat=1):
+    try:
+        result = time_statement(statement, repeat)
+        result.update(_probe(MEMORY_PROBE, statement))
+        result['slowest'] = _slowest_imports(_run(['-X', 'importtime', '-c', statement]).stderr, top)
+    except RuntimeError as exc:
+        return {'statement': statement, 'error': str(exc)}
+    result['statement'] = statement
+    return result
+
+
+# Budget check of the renewable-estimate path; returns a list of failure messages
+def check_renewable_path(budget=RENEWABLE_BUDGET_SECONDS, repeat=3):
+    try:
+        result = time_statement(RENEWABLE_IMPORT, repeat)
+    except RuntimeError as exc:
+        return [f'import failed: {exc}']
+    failures = []
+    if result['seconds'] > budget:
+        failures.append(f'cold import took {result["seconds"]:.3f} s, budget {budget:.3f} s')
+    if result['heavy']:
+        failures.append(f'pulled in heavy modules: {", ".join(result["heavy"])}')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report cold-start import time and memory per backend module')
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    parser.add_argument('--top', type=int, default=5, help='slowest imports listed per module')
+    parser.add_argument('--check', action='store_true', help='fail if the renewable path exceeds its budget')
+    parser.add_argument('--budget', type=float, default=RENEWABLE_BUDGET_SECONDS)
+    parser.add_argument('--repeat', type=int, default=3, help='cold imports timed per check, best one counts')
+    parser.add_argument('--json', action='store_true', help='print the raw results as JSON')
+    args = parser.parse_args()
+
+    if args.check:
+        failures = check_renewable_path(args.budget, args.repeat)
+        for failure in failures:
+            print(f'FAIL: {failure}')
+        if not failures:
+            print(f'OK: renewable path imports within {args.budget:.3f} s without heavy dependencies')
+        sys.exit(1 if failures else 0)
+
+    results = [profile_statement(f'import {module}', args.top) for module in args.modules]
+    results.append(profile_statement(RENEWABLE_IMPORT, args.top))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for result in results:
+        if 'error' in result:
+            print(f'{result["statement"]}: failed ({result["error"]})')
+            continue
+        heavy = ', '.join(result['heavy']) or 'none'
+        rss = 'n/a' if result['rss_mb'] is None else f'+{result["rss_mb"]:.1f} MB'
+        print(f'{result["statement"]}: {result["seconds"]:.3f} s, peak traced {result["peak_mb"]:.1f} MB, '
+              f'RSS {rss}, heavy: {heavy}')
+        for seconds, name in result['slowest']:
+            print(f'    {seconds:7.3f} s  {name}')
+
+
+if __name__ == '__main__':
+    main()
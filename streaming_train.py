@@ -0,0 +1,261 @@
+# streaming_train.py
+# Train the demand model from the London smart-meter block files without loading
+# them into memory. Block files (named in the `file` column of
+# informations_households.csv) are read chunk by chunk and fed to XGBoost through
+# a DataIter-backed external-memory DMatrix. Rows are routed to train or test by a
+# deterministic hash of (LCLid, day), so the split never materializes copies.
+#
+#   python streaming_train.py --blocks-dir datasets/halfhourly_dataset --kind halfhourly
+#   python streaming_train.py --blocks-dir datasets/daily_dataset --kind daily --day-format %Y-%m-%d
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+import data_cache
+import model_store
+from pipeline import FEATURE_COLUMNS, MODEL_PARAMS, TARGET_COLUMN
+
+HOUSEHOLDS_PATH = 'informations_households.csv'
+HALFHOURLY_ENERGY_COLUMN = 'energy(kWh/hh)'
+DEFAULT_CHUNKSIZE = 1_000_000
+TEST_FRACTION = 0.2
+
+
+# Peak resident memory of this process in MB, or None when it cannot be measured.
+# resource is POSIX-only; on Windows the peak working set comes from psutil if installed.
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / 2 ** 20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+# Sorted LCLids give the same codes as astype('category') on the full dataset
+def household_categories(households_path=HOUSEHOLDS_PATH):
+    households = pd.read_csv(households_path, usecols=['LCLid', 'file'])
+    return sorted(households['LCLid'].unique()), sorted(households['file'].unique(), key=lambda f: int(f.split('_')[-1]))
+
+
+def block_paths(blocks_dir, households_path=HOUSEHOLDS_PATH):
+    _, files = household_categories(households_path)
+    return [os.path.join(blocks_dir, f'{name}.csv') for name in files if os.path.exists(os.path.join(blocks_dir, f'{name}.csv'))]
+
+
+def _calendar_frame(codes, day, target):
+    return pd.DataFrame({
+        'LCLid': codes,
+        'day_of_week': day.dt.dayofweek.to_numpy(),
+        'month': day.dt.month.to_numpy(),
+        'day_of_month': day.dt.day.to_numpy(),
+        'year': day.dt.year.to_numpy(),
+        TARGET_COLUMN: target
+    })
+
+
+# Daily block files already hold energy_median per (LCLid, day)
+def daily_batches(path, categories, chunksize, day_format):
+    for chunk in pd.read_csv(path, usecols=['LCLid', 'day', TARGET_COLUMN], chunksize=chunksize):
+        chunk = chunk.dropna()
+        day = pd.to_datetime(chunk['day'], format=day_format)
+        codes = pd.Categorical(chunk['LCLid'], categories=categories).codes
+        yield _calendar_frame(codes, day, chunk[TARGET_COLUMN].to_numpy(dtype='float32'))
+
+
+# Half-hourly block files are aggregated to the daily median per (LCLid, day).
+# Files are ordered by LCLid and time, so only the last (LCLid, day) of a chunk can
+# continue into the next one; it is carried over instead of being split.
+def halfhourly_batches(path, categories, chunksize, day_format=None):
+    carry = None
+    reader = pd.read_csv(path, usecols=['LCLid', 'tstp', HALFHOURLY_ENERGY_COLUMN], chunksize=chunksize)
+    for chunk in reader:
+        chunk = chunk.rename(columns={HALFHOURLY_ENERGY_COLUMN: 'energy'})
+        chunk['energy'] = pd.to_numeric(chunk['energy'], errors='coerce')
+        chunk['day'] = pd.to_datetime(chunk['tstp']).dt.normalize()
+        chunk = chunk.drop(columns='tstp')
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+
+        last = chunk.iloc[-1]
+        tail = (chunk['LCLid'] == last['LCLid']).to_numpy() & (chunk['day'] == last['day']).to_numpy()
+        carry = chunk[tail]
+        batch = _aggregate_halfhourly(chunk[~tail], categories)
+        if len(batch):
+            yield batch
+    if carry is not None and len(carry):
+        yield _aggregate_halfhourly(carry, categories)
+
+
+def _aggregate_halfhourly(rows, categories):
+    daily = rows.groupby(['LCLid', 'day'], sort=False)['energy'].median().dropna().reset_index()
+    codes = pd.Categorical(daily['LCLid'], categories=categories).codes
+    return _calendar_frame(codes, daily['day'], daily['energy'].to_numpy(dtype='float32'))
+
+
+BATCH_READERS = {'daily': daily_batches, 'halfhourly': halfhourly_batches}
+
+
+# True for rows in the test split: a stable hash of (LCLid code, day) puts ~TEST_FRACTION of rows there
+def test_mask(batch):
+    day_number = (batch['year'].to_numpy(dtype='int64') * 372
+                  + batch['month'].to_numpy(dtype='int64') * 31
+                  + batch['day_of_month'].to_numpy(dtype='int64'))
+    key = batch['LCLid'].to_numpy(dtype='uint64') * np.uint64(1_000_003) + day_number.astype('uint64')
+    mixed = (key * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(40)
+    return (mixed % np.uint64(1000)) < np.uint64(int(TEST_FRACTION * 1000))
+
+
+class BlockIterator(xgb.DataIter):
+    def __init__(self, paths, kind, categories, chunksize, day_format, split, cache_prefix):
+        self.paths = paths
+        self.kind = kind
+        self.categories = categories
+        self.chunksize = chunksize
+        self.day_format = day_format
+        self.split = split
+        self.rows = 0
+        self._batches = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    # Non-empty batches of this iterator's split, read fresh from the block files.
+    # A chunk routed entirely to the other split is skipped: XGBoost's external-memory
+    # DMatrix does not accept zero-row pages.
+    def batches(self):
+        reader = BATCH_READERS[self.kind]
+        for path in self.paths:
+            for batch in reader(path, self.categories, self.chunksize, self.day_format):
+                mask = test_mask(batch)
+                batch = batch[mask] if self.split == 'test' else batch[~mask]
+                if len(batch):
+                    yield batch
+
+    def next(self, input_data):
+        batch = next(self._batches, None)
+        if batch is None:
+            return 0
+        self.rows += len(batch)
+        input_data(data=batch[FEATURE_COLUMNS], label=batch[TARGET_COLUMN])
+        return 1
+
+    def reset(self):
+        self.rows = 0
+        self._batches = self.batches()
+
+
+def booster_params(params):
+    mapped = {k: v for k, v in params.items() if k not in ('n_estimators', 'learning_rate')}
+    mapped['eta'] = params.get('learning_rate', 0.3)
+    mapped['tree_method'] = 'hist'
+    return mapped, params.get('n_estimators', 100)
+
+
+# Stream the test split through the booster, accumulating RMSE and R^2 without keeping predictions
+def evaluate_streaming(booster, test_iter):
+    n = 0
+    sse = 0.0
+    sum_y = 0.0
+    sum_y2 = 0.0
+    for batch in test_iter.batches():
+        y = batch[TARGET_COLUMN].to_numpy(dtype='float64')
+        pred = booster.inplace_predict(batch[FEATURE_COLUMNS])
+        sse += float(((y - pred) ** 2).sum())
+        sum_y += float(y.sum())
+        sum_y2 += float((y * y).sum())
+        n += len(y)
+    if n == 0:
+        return {'rmse': float('nan'), 'r2': float('nan'), 'test_rows': 0}
+    sst = sum_y2 - sum_y * sum_y / n
+    return {'rmse': float(np.sqrt(sse / n)), 'r2': float(1 - sse / sst) if sst > 0 else float('nan'), 'test_rows': n}
+
+
+def blocks_fingerprint(paths, kind, params):
+    payload = {
+        'kind': kind,
+        'params': params,
+        'features': FEATURE_COLUMNS,
+        'blocks': {os.path.basename(p): data_cache.source_signature(p) for p in paths}
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:20]
+
+
+# Train from block files with bounded memory. Returns (booster, metadata).
+def train_streaming(blocks_dir, kind='halfhourly', params=MODEL_PARAMS, chunksize=DEFAULT_CHUNKSIZE,
+                    day_format='%d-%m-%Y', households_path=HOUSEHOLDS_PATH, cache_dir=None, store=True):
+    categories, _ = household_categories(households_path)
+    paths = block_paths(blocks_dir, households_path)
+    if not paths:
+        raise FileNotFoundError(f'No block files from {households_path} found in {blocks_dir}')
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(dir=cache_dir) as tmp:
+        train_iter = BlockIterator(paths, kind, categories, chunksize, day_format, 'train', os.path.join(tmp, 'train'))
+        dtrain = xgb.DMatrix(train_iter)
+        train_params, rounds = booster_params(params)
+        booster = xgb.train(train_params, dtrain, num_boost_round=rounds)
+        train_rows = dtrain.num_row()
+        del dtrain
+    train_seconds = time.perf_counter() - start
+
+    test_iter = BlockIterator(paths, kind, categories, chunksize, day_format, 'test', None)
+    metrics = evaluate_streaming(booster, test_iter)
+
+    metadata = {
+        'key': blocks_fingerprint(paths, kind, params),
+        'store_version': model_store.STORE_VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'xgboost_version': xgb.__version__,
+        'features': FEATURE_COLUMNS,
+        'target': TARGET_COLUMN,
+        'params': params,
+        'metrics': {'rmse': metrics['rmse'], 'r2': metrics['r2']},
+        'train_rows': train_rows,
+        'test_rows': metrics['test_rows'],
+        'train_seconds': train_seconds,
+        'peak_rss_mb': peak_rss_mb(),
+        'source': {'kind': kind, 'blocks': len(paths), 'chunksize': chunksize},
+        'lclid_categories': categories
+    }
+    if store:
+        model_store.save_model(booster, metadata['key'], metadata)
+    return booster, metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the demand model from block files in bounded memory')
+    parser.add_argument('--blocks-dir', required=True)
+    parser.add_argument('--kind', choices=sorted(BATCH_READERS), default='halfhourly')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--day-format', default='%d-%m-%Y', help='format of the day column in daily block files')
+    parser.add_argument('--cache-dir', default=None, help='where XGBoost writes its external-memory pages')
+    parser.add_argument('--no-store', action='store_true', help='do not save the model to the model store')
+    args = parser.parse_args()
+
+    _, metadata = train_streaming(args.blocks_dir, args.kind, chunksize=args.chunksize, day_format=args.day_format,
+                                  cache_dir=args.cache_dir, store=not args.no_store)
+    print(f'Root Mean Squared Error: {metadata["metrics"]["rmse"]}')
+    print(f'R-squared: {metadata["metrics"]["r2"]}')
+    print(f'Train rows: {metadata["train_rows"]}, test rows: {metadata["test_rows"]}')
+    peak = metadata['peak_rss_mb']
+    print(f'Training time: {metadata["train_seconds"]:.1f} s, peak RSS: '
+          f'{"n/a" if peak is None else f"{peak:.1f} MB"}')
+    if not args.no_store:
+        print(f'Stored model {metadata["key"]}')
+
+
+if __name__ == '__main__':
+    main()
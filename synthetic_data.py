@@ -0,0 +1,208 @@
+# synthetic_data.py
+# Synthetic smart-meter readings in the layout of the London datasets.
+# Households are drawn from informations_households.csv (and replicated with
+# "-r<k>" suffixed ids when more are requested than exist), so LCLid, tariff,
+# ACORN group and block file stay consistent with the metadata. Daily use follows
+# an ACORN/tariff-dependent base load with winter seasonality, weekend and bank
+# holiday uplift and autocorrelated day-to-day noise. Half-hourly readings split
+# each day over one of a few load profiles and sum exactly to the daily energy_sum;
+# the daily median/max/min/std are the profile's statistics scaled to that day.
+#
+#   python synthetic_data.py --households 5566 --days 365 --output datasets
+#   python synthetic_data.py --households 500 --days 30 --halfhourly --output bench_data
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from feature_store import HOUSEHOLDS_PATH, is_holiday
+
+COORDINATES_PATH = 'synthetic_locality_coordinates.csv'
+DAY_FORMAT = '%d-%m-%Y'
+SLOTS = 48
+CHUNK_HOUSEHOLDS = 2000
+HALFHOURLY_CHUNK_HOUSEHOLDS = 100  # bounds the households x days x 48 arrays
+
+DAILY_COLUMNS = ['LCLid', 'day', 'energy_median', 'energy_mean', 'energy_max', 'energy_count',
+                 'energy_std', 'energy_sum', 'energy_min']
+HALFHOURLY_ENERGY_COLUMN = 'energy(kWh/hh)'
+
+# kWh per day by ACORN group, and the multiplier for time-of-use tariffs
+BASE_KWH = {'Affluent': 12.5, 'Comfortable': 10.0, 'Adversity': 8.5}
+DEFAULT_BASE_KWH = 10.0
+TOU_FACTOR = 0.95
+SEASONAL_AMPLITUDE = 0.3
+WEEKEND_UPLIFT = 0.08
+HOLIDAY_UPLIFT = 0.05
+AR_COEFFICIENT = 0.7
+NOISE_SD = 0.12
+
+
+# Normalised half-hourly load shapes (each row sums to 1): overnight base load plus
+# morning and evening peaks at different times
+def load_profiles():
+    hours = np.arange(SLOTS) / 2
+    peaks = [(7.5, 18.5), (8.0, 19.5), (6.5, 17.5), (9.0, 21.0)]
+    profiles = []
+    for morning, evening in peaks:
+        shape = 0.6 + 0.8 * np.exp(-0.5 * ((hours - morning) / 1.2) ** 2) + 1.5 * np.exp(-0.5 * ((hours - evening) / 2.0) ** 2)
+        profiles.append(shape / shape.sum())
+    return np.array(profiles)
+
+
+PROFILES = load_profiles()
+PROFILE_STATS = {
+    'median': np.median(PROFILES, axis=1),
+    'max': PROFILES.max(axis=1),
+    'min': PROFILES.min(axis=1),
+    'std': PROFILES.std(axis=1, ddof=1)
+}
+
+
+# Metadata of n households: the real ones first, then replicas of them
+def household_table(n_households, households_path=HOUSEHOLDS_PATH):
+    households = pd.read_csv(households_path)
+    replicas = []
+    for k in range(-(-n_households // len(households))):
+        replica = households.copy()
+        replica['source_LCLid'] = households['LCLid']
+        if k:
+            replica['LCLid'] = households['LCLid'] + f'-r{k}'
+        replicas.append(replica)
+    return pd.concat(replicas, ignore_index=True).iloc[:n_households].reset_index(drop=True)
+
+
+def household_parameters(households, seed=0):
+    rng = np.random.default_rng(seed)
+    base = households['Acorn_grouped'].map(BASE_KWH).fillna(DEFAULT_BASE_KWH).to_numpy(dtype='float64')
+    base = base * np.where(households['stdorToU'].to_numpy() == 'ToU', TOU_FACTOR, 1.0)
+    return {
+        'base': base * rng.lognormal(0, 0.35, len(households)),
+        'profile': rng.integers(0, len(PROFILES), len(households))
+    }
+
+
+# Daily totals (households x days) for one chunk of households
+def daily_totals(params, days, rng):
+    n = len(params['base'])
+    seasonal = 1 + SEASONAL_AMPLITUDE * np.cos(2 * np.pi * (days.dayofyear.to_numpy() - 15) / 365.25)
+    calendar = seasonal * (1 + WEEKEND_UPLIFT * (days.dayofweek.to_numpy() >= 5)) * (1 + HOLIDAY_UPLIFT * is_holiday(days))
+
+    shocks = rng.normal(0, NOISE_SD, (n, len(days)))
+    noise = np.empty_like(shocks)
+    noise[:, 0] = shocks[:, 0]
+    for d in range(1, len(days)):
+        noise[:, d] = AR_COEFFICIENT * noise[:, d - 1] + np.sqrt(1 - AR_COEFFICIENT ** 2) * shocks[:, d]
+    return params['base'][:, None] * calendar[None, :] * np.exp(noise - NOISE_SD ** 2 / 2)
+
+
+def daily_frame(lclids, params, days, totals):
+    profile = params['profile']
+    n_days = len(days)
+    per_slot = {name: np.repeat(stat[profile], n_days) for name, stat in PROFILE_STATS.items()}
+    total = totals.reshape(-1)
+    return pd.DataFrame({
+        'LCLid': np.repeat(np.asarray(lclids, dtype=object), n_days),
+        'day': np.tile(days.strftime(DAY_FORMAT).to_numpy(), len(lclids)),
+        'energy_median': total * per_slot['median'],
+        'energy_mean': total / SLOTS,
+        'energy_max': total * per_slot['max'],
+        'energy_count': SLOTS,
+        'energy_std': total * per_slot['std'],
+        'energy_sum': total,
+        'energy_min': total * per_slot['min']
+    }, columns=DAILY_COLUMNS)
+
+
+# Half-hourly readings that sum to each day's total
+def halfhourly_frame(lclids, params, days, totals, rng):
+    n, n_days = totals.shape
+    weights = PROFILES[params['profile']][:, None, :] * rng.gamma(8.0, 1 / 8.0, (n, n_days, SLOTS))
+    weights /= weights.sum(axis=2, keepdims=True)
+    energy = (totals[:, :, None] * weights).reshape(-1)
+    stamps = (days.to_numpy()[:, None] + pd.to_timedelta(np.arange(SLOTS) * 30, unit='min').to_numpy()[None, :]).reshape(-1)
+    return pd.DataFrame({
+        'LCLid': np.repeat(np.asarray(lclids, dtype=object), n_days * SLOTS),
+        'tstp': np.tile(pd.DatetimeIndex(stamps).strftime('%Y-%m-%d %H:%M:%S.0000000').to_numpy(), n),
+        HALFHOURLY_ENERGY_COLUMN: energy.round(3)
+    })
+
+
+# Coordinates for every household; replicas reuse their source's points with a small jitter
+def household_coordinates(households, coordinates_path=COORDINATES_PATH, seed=0, jitter_degrees=0.002):
+    rng = np.random.default_rng(seed)
+    coordinates = pd.read_csv(coordinates_path)
+    merged = households[['LCLid', 'source_LCLid']].merge(coordinates, left_on='source_LCLid', right_on='LCLid',
+                                                         suffixes=('', '_source'))
+    replica = (merged['LCLid'] != merged['source_LCLid']).to_numpy()
+    for column in ('latitude', 'longitude'):
+        merged.loc[replica, column] += rng.uniform(-jitter_degrees, jitter_degrees, replica.sum())
+    return merged[['LCLid', 'latitude', 'longitude']]
+
+
+# Write daily_dataset.csv (plus household metadata, coordinates and optionally
+# half-hourly block files) for n_households over days starting at start_date
+def generate(output_dir, n_households, n_days, start_date='2012-01-01', halfhourly=False, seed=0,
+             households_path=HOUSEHOLDS_PATH, coordinates_path=COORDINATES_PATH):
+    start = time.perf_counter()
+    if os.path.abspath(output_dir) in {os.path.dirname(os.path.abspath(p)) for p in (households_path, coordinates_path)}:
+        raise ValueError(f'Output directory {output_dir!r} would overwrite the source household metadata')
+    os.makedirs(output_dir, exist_ok=True)
+    households = household_table(n_households, households_path)
+    params = household_parameters(households, seed)
+    days = pd.date_range(start_date, periods=n_days, freq='D')
+
+    households.drop(columns='source_LCLid').to_csv(os.path.join(output_dir, 'informations_households.csv'), index=False)
+    household_coordinates(households, coordinates_path, seed).to_csv(
+        os.path.join(output_dir, 'synthetic_locality_coordinates.csv'), index=False)
+
+    daily_path = os.path.join(output_dir, 'daily_dataset.csv')
+    halfhourly_dir = os.path.join(output_dir, 'halfhourly_dataset')
+    if halfhourly:
+        os.makedirs(halfhourly_dir, exist_ok=True)
+        for name in households['file'].unique():
+            open(os.path.join(halfhourly_dir, f'{name}.csv'), 'w').close()
+
+    rows = 0
+    for chunk, offset in enumerate(range(0, n_households, CHUNK_HOUSEHOLDS)):
+        rng = np.random.default_rng([seed, chunk])
+        part = households.iloc[offset:offset + CHUNK_HOUSEHOLDS]
+        part_params = {name: values[offset:offset + CHUNK_HOUSEHOLDS] for name, values in params.items()}
+        totals = daily_totals(part_params, days, rng)
+
+        daily = daily_frame(part['LCLid'], part_params, days, totals)
+        daily.to_csv(daily_path, mode='w' if chunk == 0 else 'a', header=chunk == 0, index=False, float_format='%.3f')
+        rows += len(daily)
+
+        for sub in range(0, len(part) if halfhourly else 0, HALFHOURLY_CHUNK_HOUSEHOLDS):
+            rows_slice = slice(sub, sub + HALFHOURLY_CHUNK_HOUSEHOLDS)
+            sub_params = {name: values[rows_slice] for name, values in part_params.items()}
+            readings = halfhourly_frame(part['LCLid'].iloc[rows_slice], sub_params, days, totals[rows_slice], rng)
+            blocks = np.repeat(part['file'].iloc[rows_slice].to_numpy(), len(days) * SLOTS)
+            for name, block in readings.groupby(blocks, sort=False):
+                path = os.path.join(halfhourly_dir, f'{name}.csv')
+                block.to_csv(path, mode='a', header=os.path.getsize(path) == 0, index=False)
+
+    return {'households': n_households, 'days': n_days, 'daily_rows': rows, 'path': daily_path,
+            'seconds': time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic smart-meter data consistent with the household metadata')
+    parser.add_argument('--households', type=int, default=5566)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--start', default='2012-01-01')
+    parser.add_argument('--output', default='datasets')
+    parser.add_argument('--halfhourly', action='store_true', help='also write half-hourly block files')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    summary = generate(args.output, args.households, args.days, args.start, args.halfhourly, args.seed)
+    print(f'Wrote {summary["daily_rows"]} daily rows for {summary["households"]} households to '
+          f'{summary["path"]} in {summary["seconds"]:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
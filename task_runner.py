@@ -0,0 +1,117 @@
+# task_runner.py
+# Runs GUI jobs (inference, allocation, map rendering) off the Tk main thread.
+#  - Results come back to the GUI through root.after, never from a worker thread.
+#  - Each channel (e.g. "predict") only delivers its newest job; older jobs are
+#    cancelled if they have not started and their results dropped if they have.
+#  - Submitting a key that is already in flight joins that job instead of running it twice.
+import queue
+import threading
+import traceback
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+
+class TaskRunner:
+    def __init__(self, root, max_workers=2, poll_ms=50, on_busy=None, executor=None):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.on_busy = on_busy
+        # Any concurrent.futures executor works; a ProcessPoolExecutor needs picklable jobs
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='gui-task')
+
+        self._lock = threading.Lock()
+        self._results = queue.Queue()
+        self._inflight = {}     # key -> (future, [(channel, generation, on_success, on_error), ...])
+        self._generation = {}   # channel -> newest generation submitted on it
+        self._polling = False
+        self._busy = False
+
+    # Run fn(*args) in the pool; on_success(result) / on_error(exc) run on the Tk thread
+    # only if this is still the newest job on its channel when it finishes.
+    def submit(self, channel, key, fn, *args, on_success=None, on_error=None):
+        with self._lock:
+            generation = self._generation.get(channel, 0) + 1
+            self._generation[channel] = generation
+            listener = (channel, generation, on_success, on_error)
+
+            entry = self._inflight.get(key)
+            if entry is not None and not entry[0].cancelled():
+                entry[1].append(listener)
+            else:
+                # A cancelled job under this key never delivers; replace it with a fresh one
+                self._cancel_stale(channel)
+                future = self.executor.submit(fn, *args)
+                self._inflight[key] = (future, [listener])
+                future.add_done_callback(lambda f, key=key: self._results.put((key, f)))
+
+        self._set_busy(True)
+        self._ensure_polling()
+        return generation
+
+    # Drop whatever is pending on a channel, e.g. when the user picks a new date
+    def cancel(self, channel):
+        with self._lock:
+            self._generation[channel] = self._generation.get(channel, 0) + 1
+            self._cancel_stale(channel)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    # Cancel not-yet-started jobs whose listeners all belong to an outdated generation of channel
+    def _cancel_stale(self, channel):
+        current = self._generation.get(channel)
+        for future, listeners in self._inflight.values():
+            if all(c == channel and g != current for c, g, _, _ in listeners):
+                future.cancel()
+
+    def _ensure_polling(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        while True:
+            try:
+                key, future = self._results.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                entry = self._inflight.get(key)
+                # The key may since have been resubmitted after this future was cancelled
+                if entry is not None and entry[0] is future:
+                    del self._inflight[key]
+                    listeners = entry[1]
+                else:
+                    listeners = []
+                current = dict(self._generation)
+            for channel, generation, on_success, on_error in listeners:
+                if current.get(channel) != generation:
+                    continue
+                self._deliver(future, on_success, on_error)
+
+        with self._lock:
+            idle = not self._inflight
+        if idle:
+            self._polling = False
+            self._set_busy(False)
+        else:
+            self.root.after(self.poll_ms, self._poll)
+
+    def _deliver(self, future, on_success, on_error):
+        try:
+            result = future.result()
+        except CancelledError:
+            return
+        except Exception as exc:
+            if on_error is not None:
+                on_error(exc)
+            else:
+                traceback.print_exception(type(exc), exc, exc.__traceback__)
+            return
+        if on_success is not None:
+            on_success(result)
+
+    def _set_busy(self, busy):
+        if busy != self._busy:
+            self._busy = busy
+            if self.on_busy is not None:
+                self.root.after(0, self.on_busy, busy)
@@ -0,0 +1,138 @@
+# tree_predictor.py
+# Dependency-light inference for the trained demand model.
+# The booster is flattened once into padded NumPy arrays (trees x nodes); prediction
+# walks every row down every tree at once, one level per step, so it needs only
+# NumPy at run time and takes plain arrays without pandas conversion. Splits follow
+# XGBoost's rule: go left when x < threshold in float32, missing values take the
+# default branch. Only numeric splits of a single-output regression model are supported.
+#
+#   python tree_predictor.py --output demand_trees.npz
+import argparse
+import json
+
+import numpy as np
+
+CHUNK_ROWS = 65536
+
+
+def _parse_float(value):
+    return float(str(value).strip('[]'))
+
+
+def _tree_depth(left, right):
+    depth = np.zeros(len(left), dtype='int32')
+    for node in range(len(left)):
+        if left[node] != -1:
+            depth[left[node]] = depth[node] + 1
+            depth[right[node]] = depth[node] + 1
+    return int(depth.max()) if len(depth) else 0
+
+
+# Padded node arrays of an XGBoost model (XGBRegressor or Booster)
+def flatten_booster(model):
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    config = json.loads(bytes(booster.save_raw('json')).decode())
+    learner = config['learner']
+    trees = learner['gradient_booster']['model']['trees']
+    if any(tree.get('categories_nodes') for tree in trees):
+        raise ValueError('Categorical splits are not supported by the NumPy predictor')
+
+    n_trees = len(trees)
+    max_nodes = max(int(tree['tree_param']['num_nodes']) for tree in trees) if trees else 1
+    arrays = {
+        'left': np.full((n_trees, max_nodes), -1, dtype='int32'),
+        'right': np.full((n_trees, max_nodes), -1, dtype='int32'),
+        'feature': np.zeros((n_trees, max_nodes), dtype='int32'),
+        'threshold': np.zeros((n_trees, max_nodes), dtype='float32'),
+        'default_left': np.zeros((n_trees, max_nodes), dtype=bool),
+        'value': np.zeros((n_trees, max_nodes), dtype='float32')
+    }
+    max_depth = 0
+    for t, tree in enumerate(trees):
+        left = np.asarray(tree['left_children'], dtype='int32')
+        right = np.asarray(tree['right_children'], dtype='int32')
+        n = len(left)
+        arrays['left'][t, :n] = left
+        arrays['right'][t, :n] = right
+        arrays['feature'][t, :n] = tree['split_indices']
+        arrays['threshold'][t, :n] = tree['split_conditions']
+        arrays['default_left'][t, :n] = np.asarray(tree['default_left'], dtype=bool)
+        # Leaves keep their output in split_conditions
+        arrays['value'][t, :n] = np.where(left == -1, np.asarray(tree['split_conditions'], dtype='float32'), 0)
+        max_depth = max(max_depth, _tree_depth(left, right))
+
+    arrays['base_score'] = np.float32(_parse_float(learner['learner_model_param']['base_score']))
+    arrays['max_depth'] = np.int32(max_depth)
+    feature_names = learner.get('feature_names') or []
+    arrays['feature_names'] = np.asarray(feature_names, dtype=str)
+    return arrays
+
+
+class TreePredictor:
+    def __init__(self, arrays):
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.default_left = arrays['default_left']
+        self.value = arrays['value']
+        self.base_score = np.float32(arrays['base_score'])
+        self.max_depth = int(arrays['max_depth'])
+        self.feature_names = [str(name) for name in arrays['feature_names']]
+        self._tree_ids = np.arange(self.left.shape[0])[None, :]
+
+    @classmethod
+    def from_model(cls, model):
+        return cls(flatten_booster(model))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls({name: data[name] for name in data.files})
+
+    def save(self, path):
+        np.savez(path, left=self.left, right=self.right, feature=self.feature, threshold=self.threshold,
+                 default_left=self.default_left, value=self.value, base_score=self.base_score,
+                 max_depth=np.int32(self.max_depth), feature_names=np.asarray(self.feature_names, dtype=str))
+
+    # Rows x features float32 matrix; DataFrames are put in the model's feature order
+    def _matrix(self, X):
+        if hasattr(X, 'columns'):
+            X = X[self.feature_names] if self.feature_names else X
+            X = X.to_numpy(dtype='float32')
+        return np.atleast_2d(np.asarray(X, dtype='float32'))
+
+    def _predict_chunk(self, X):
+        rows = np.arange(len(X))[:, None]
+        node = np.zeros((len(X), self.left.shape[0]), dtype='int32')
+        for _ in range(self.max_depth):
+            left = self.left[self._tree_ids, node]
+            x = X[rows, self.feature[self._tree_ids, node]]
+            go_left = np.where(np.isnan(x), self.default_left[self._tree_ids, node], x < self.threshold[self._tree_ids, node])
+            node = np.where(left == -1, node, np.where(go_left, left, self.right[self._tree_ids, node]))
+        return self.value[self._tree_ids, node].sum(axis=1, dtype='float32') + self.base_score
+
+    def predict(self, X):
+        X = self._matrix(X)
+        if len(X) <= CHUNK_ROWS:
+            return self._predict_chunk(X)
+        return np.concatenate([self._predict_chunk(X[i:i + CHUNK_ROWS]) for i in range(0, len(X), CHUNK_ROWS)])
+
+
+def main():
+    # Imported here so the predictor itself never loads xgboost or pandas
+    from pipeline import get_context
+
+    parser = argparse.ArgumentParser(description='Export the demand model as NumPy node arrays')
+    parser.add_argument('--output', default='demand_trees.npz')
+    args = parser.parse_args()
+
+    model, metadata = get_context().model()
+    predictor = TreePredictor.from_model(model)
+    predictor.save(args.output)
+    print(f'Exported {predictor.left.shape[0]} trees (max depth {predictor.max_depth}) of model '
+          f'{metadata["key"]} to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
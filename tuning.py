@@ -0,0 +1,210 @@
+# tuning.py
+# Time-series cross-validated hyperparameter search for the demand model.
+# Folds split on days (train on earlier days, validate on the following block), so
+# no fold validates on days that precede its training data. Configurations are
+# evaluated in parallel worker processes, each loading the dataset once. For every
+# config the report records RMSE/R^2 together with train time and inference latency,
+# plus the configs on the latency/RMSE Pareto front.
+#
+#   python tuning.py --splits 4 --workers 4 --output outputs/tuning
+import argparse
+import itertools
+import json
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import mean_squared_error, r2_score
+
+import model_store
+from pipeline import FEATURE_COLUMNS, MODEL_PARAMS, TARGET_COLUMN, get_context
+
+# Default search space, combined with MODEL_PARAMS
+PARAM_GRID = {
+    'n_estimators': [50, 150, 300],
+    'learning_rate': [0.05, 0.2],
+    'max_depth': [4, 6, 8]
+}
+SEED = 42
+LATENCY_REPEATS = 20   # single-row predictions timed per fold
+# Set by evaluate_config for every config: seeded, and one thread per worker process
+FIXED_PARAMS = {'random_state': SEED, 'n_jobs': 1}
+
+_worker_df = None
+
+
+def expand_grid(grid, base=MODEL_PARAMS):
+    fixed = sorted(set(grid) & set(FIXED_PARAMS))
+    if fixed:
+        raise ValueError(f'The grid cannot set {fixed}; the search fixes them to {FIXED_PARAMS}')
+    names = sorted(grid)
+    return [{**base, **dict(zip(names, values))} for values in itertools.product(*(grid[n] for n in names))]
+
+
+# Expanding-window folds over the sorted unique days: fold i trains on the first
+# blocks and validates on the next one. Returns a list of (train_days_end, valid_days_end).
+def time_series_folds(days, n_splits=4):
+    unique_days = np.sort(pd.unique(pd.to_datetime(days)))
+    if len(unique_days) < n_splits + 1:
+        raise ValueError(f'Need at least {n_splits + 1} distinct days for {n_splits} folds')
+    bounds = np.linspace(0, len(unique_days), n_splits + 2).astype(int)[1:]
+    return [(unique_days[bounds[i] - 1], unique_days[bounds[i + 1] - 1]) for i in range(n_splits)]
+
+
+def sample_households(df, fraction, seed=SEED):
+    if fraction >= 1:
+        return df
+    lclids = df['LCLid'].unique()
+    rng = np.random.default_rng(seed)
+    keep = rng.choice(lclids, max(1, int(len(lclids) * fraction)), replace=False)
+    sampled = df[df['LCLid'].isin(keep)]
+    sampled.attrs = dict(df.attrs)
+    return sampled
+
+
+# Worker setup: with sample set, each worker loads the dataset itself through the
+# columnar cache (memory-mapped, so the pages are shared) and draws the same sample;
+# otherwise df is the frame to use, pickled into every worker
+def _init_worker(df=None, sample=None):
+    global _worker_df
+    _worker_df = df if sample is None else sample_households(get_context().dataset(), sample)
+
+
+# Cross-validate one configuration; runs inside a worker process
+def evaluate_config(params, folds, features=FEATURE_COLUMNS, df=None):
+    df = _worker_df if df is None else df
+    fold_results = []
+    for train_end, valid_end in folds:
+        train = df[df['day'] <= train_end]
+        valid = df[(df['day'] > train_end) & (df['day'] <= valid_end)]
+
+        model = xgb.XGBRegressor(**{**params, **FIXED_PARAMS})
+        start = time.perf_counter()
+        model.fit(train[features], train[TARGET_COLUMN])
+        train_seconds = time.perf_counter() - start
+
+        X_valid = valid[features]
+        start = time.perf_counter()
+        y_pred = model.predict(X_valid)
+        batch_seconds = time.perf_counter() - start
+
+        row = X_valid.iloc[:1]
+        start = time.perf_counter()
+        for _ in range(LATENCY_REPEATS):
+            model.predict(row)
+        single_row_ms = (time.perf_counter() - start) / LATENCY_REPEATS * 1000
+
+        fold_results.append({
+            'train_end': str(pd.Timestamp(train_end).date()),
+            'valid_end': str(pd.Timestamp(valid_end).date()),
+            'train_rows': len(train),
+            'valid_rows': len(valid),
+            'rmse': float(np.sqrt(mean_squared_error(valid[TARGET_COLUMN], y_pred))),
+            'r2': float(r2_score(valid[TARGET_COLUMN], y_pred)),
+            'train_seconds': train_seconds,
+            'predict_rows_per_second': len(valid) / batch_seconds if batch_seconds else float('inf'),
+            'single_row_ms': single_row_ms
+        })
+
+    summary = {name: float(np.mean([f[name] for f in fold_results]))
+               for name in ['rmse', 'r2', 'train_seconds', 'predict_rows_per_second', 'single_row_ms']}
+    summary['rmse_std'] = float(np.std([f['rmse'] for f in fold_results]))
+    return {'params': params, 'summary': summary, 'folds': fold_results}
+
+
+# Configs not beaten on both single-row latency and RMSE by any other config
+def pareto_front(results):
+    front = []
+    for r in results:
+        s = r['summary']
+        dominated = any(
+            o['summary']['rmse'] <= s['rmse'] and o['summary']['single_row_ms'] <= s['single_row_ms']
+            and (o['summary']['rmse'] < s['rmse'] or o['summary']['single_row_ms'] < s['single_row_ms'])
+            for o in results
+        )
+        if not dominated:
+            front.append(r)
+    return sorted(front, key=lambda r: r['summary']['single_row_ms'])
+
+
+# Evaluate every config of the grid in parallel and return the sorted results.
+# Pass sample when df is sample_households(dataset, sample), so workers load it themselves.
+def search(df, grid=PARAM_GRID, n_splits=4, max_workers=None, features=FEATURE_COLUMNS, sample=None):
+    folds = time_series_folds(df['day'], n_splits)
+    configs = expand_grid(grid)
+    results = []
+    initargs = (None, sample) if sample is not None else (df, None)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=initargs) as pool:
+        futures = [pool.submit(evaluate_config, params, folds, features) for params in configs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            s = result['summary']
+            print(f'{json.dumps(result["params"], sort_keys=True)}: RMSE {s["rmse"]:.4f}, '
+                  f'R-squared {s["r2"]:.4f}, train {s["train_seconds"]:.2f} s, single row {s["single_row_ms"]:.2f} ms')
+    return sorted(results, key=lambda r: r['summary']['rmse']), folds
+
+
+def write_report(results, folds, df, grid, output_dir, features=FEATURE_COLUMNS):
+    os.makedirs(output_dir, exist_ok=True)
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'dataset': model_store.dataset_fingerprint(df, features + [TARGET_COLUMN]),
+        'rows': len(df),
+        'households': int(df['LCLid'].nunique()),
+        'features': features,
+        'target': TARGET_COLUMN,
+        'grid': grid,
+        'base_params': MODEL_PARAMS,
+        'seed': SEED,
+        'folds': [{'train_end': str(pd.Timestamp(t).date()), 'valid_end': str(pd.Timestamp(v).date())} for t, v in folds],
+        'environment': {
+            'python': platform.python_version(),
+            'xgboost': xgb.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count()
+        },
+        'results': results,
+        'pareto_front': [r['params'] for r in pareto_front(results)]
+    }
+    report_path = os.path.join(output_dir, 'tuning_report.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+
+    table = pd.DataFrame([{**r['params'], **r['summary']} for r in results])
+    table.to_csv(os.path.join(output_dir, 'tuning_results.csv'), index=False)
+    return report_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cross-validated hyperparameter search for the demand model')
+    parser.add_argument('--grid', help='JSON file mapping parameter names to lists of values')
+    parser.add_argument('--splits', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--sample', type=float, default=1.0, help='fraction of households to tune on')
+    parser.add_argument('--output', default=os.path.join('outputs', 'tuning'))
+    args = parser.parse_args()
+
+    grid = PARAM_GRID
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+
+    df = sample_households(get_context().dataset(), args.sample)
+    results, folds = search(df, grid, args.splits, args.workers, sample=args.sample)
+    report_path = write_report(results, folds, df, grid, args.output)
+
+    best = results[0]
+    print(f'Best RMSE: {json.dumps(best["params"], sort_keys=True)} ({best["summary"]["rmse"]:.4f})')
+    for params in [r['params'] for r in pareto_front(results)]:
+        print(f'Pareto front: {json.dumps(params, sort_keys=True)}')
+    print(f'Report written to {report_path}')
+
+
+if __name__ == '__main__':
+    main()